@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""Benchmark generate_website.py on synthetic datasets of increasing size"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+import generate_website as site
+
+DEFAULT_SIZES = [40, 1000, 10000, 100000]
+
+# Evidence entries per synthetic ingredient; research.json has 3 for every
+# ingredient, a growing catalog spreads around that
+EVIDENCE_COUNTS = [2, 3, 3, 3, 4, 5]
+
+# Distinct references per cited reference slot, as in research.json (123 of 186)
+REFERENCE_REUSE = 0.66
+
+# Dataset shaped like research.json with n ingredients, derived from the real
+# records so text lengths, categories and products stay realistic
+def synthesize(template, n, seed=0):
+    rng = random.Random(seed)
+    real = template['ingredients']
+    real_evidence = [ev for ing in real for ev in ing['researchEvidence']]
+    ref_counts = [len(ev.get('refs', ev.get('pmids', []))) for ev in real_evidence]
+    pool_size = max(1, int(n * 3 * sum(ref_counts) / len(ref_counts) * REFERENCE_REUSE))
+
+    ingredients = []
+    for i in range(n):
+        base = real[i % len(real)]
+        evidence = []
+        for _ in range(rng.choice(EVIDENCE_COUNTS)):
+            ev = dict(rng.choice(real_evidence))
+            ev.pop('pmids', None)
+            ev.pop('urls', None)
+            ev['refs'] = rng.sample(range(pool_size), min(rng.choice(ref_counts), pool_size))
+            ev['rating'] = rng.randint(3, 10)
+            evidence.append(ev)
+        ing = dict(base)
+        ing['id'] = str(i + 1)
+        ing['name'] = f"{base['name']} {i + 1}"
+        ing['slug'] = f"{base['slug']}-{i + 1}"
+        ing['keyBenefits'] = [ev['benefit'] for ev in evidence]
+        ing['researchEvidence'] = evidence
+        ingredients.append(ing)
+
+    data = {key: value for key, value in template.items() if key not in ('ingredients', 'references')}
+    data['totalIngredients'] = n
+    data['ingredients'] = ingredients
+    data['references'] = [{'pmid': str(10000000 + i)} for i in range(pool_size)]
+    return data
+
+# Time one synthetic dataset; runs in its own process so peak RSS reflects
+# that dataset alone. This is the end-to-end CLI path: load, then
+# build_site() with the default options, which streams the page to disk.
+# 'stages' are the BuildProfile totals of each stage, the same breakdown as
+# --profile, and 'total' the wall time of the whole run
+def run_dataset(dataset_path):
+    out_path = os.path.splitext(dataset_path)[0] + '.html'
+    profile = site.BuildProfile()
+    started = time.perf_counter()
+    data = profile.call('load', site.load_data, dataset_path)
+    written = site.build_site(data, out_path, site.BuildOptions(), profile=profile)
+    total = time.perf_counter() - started
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+    return {
+        'ingredients': len(data['ingredients']),
+        'evidence': sum(len(ing['researchEvidence']) for ing in data['ingredients']),
+        'stages': {name: round(stage['seconds'], 4) for name, stage in profile.stages.items()},
+        'total': round(total, 4),
+        'peakRssMb': round(peak_rss, 1),
+        'datasetBytes': os.path.getsize(dataset_path),
+        'outputBytes': sum(os.path.getsize(path) for path in written)
+    }
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                              text=True, check=True, cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+# Per-size ratio of total time against an earlier results file
+def compare(results, baseline_path):
+    with open(baseline_path, 'r', encoding='utf-8') as f:
+        baseline = {r['ingredients']: r for r in json.load(f)['results']}
+    for result in results:
+        before = baseline.get(result['ingredients'])
+        if before:
+            ratio = result['total'] / before['total'] if before['total'] else float('inf')
+            print(f"{result['ingredients']:>7} ingredients: {before['total']:.3f}s -> {result['total']:.3f}s ({ratio:.2f}x)")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the site generator on synthetic datasets')
+    parser.add_argument('-i', '--input', default='research.json',
+                        help='dataset whose records seed the synthetic ones (default: research.json)')
+    parser.add_argument('-o', '--output', default='bench_results.json',
+                        help='JSON results file to write (default: bench_results.json)')
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES,
+                        help='ingredient counts to benchmark (default: 40 1000 10000 100000)')
+    parser.add_argument('--compare', help='earlier results file to compare total times against')
+    parser.add_argument('--worker', help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.worker:
+        print(json.dumps(run_dataset(args.worker)))
+        return
+
+    template = site.load_data(args.input)
+    results = []
+    with tempfile.TemporaryDirectory() as work_dir:
+        for n in args.sizes:
+            dataset_path = os.path.join(work_dir, f'research-{n}.json')
+            with open(dataset_path, 'w', encoding='utf-8') as f:
+                json.dump(synthesize(template, n), f)
+            proc = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), '--worker', dataset_path],
+                capture_output=True, text=True, check=True
+            )
+            result = json.loads(proc.stdout)
+            results.append(result)
+            stages = ', '.join(f'{name} {seconds:.3f}s' for name, seconds in result['stages'].items())
+            print(f"{n:>7} ingredients: {stages}; total {result['total']:.3f}s, peak {result['peakRssMb']} MB, "
+                  f"output {result['outputBytes'] / 1e6:.1f} MB")
+
+    report = {
+        'commit': git_commit(),
+        'python': platform.python_version(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'results': results
+    }
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"Wrote {args.output}")
+
+    if args.compare:
+        compare(results, args.compare)
+
+if __name__ == '__main__':
+    main()
@@ -1,16 +1,39 @@
 #!/usr/bin/env python3
 """Generate a beautiful website from research.json"""
 
+import argparse
+import cProfile
+import gzip
+import hashlib
+import io
+import itertools
 import json
+import marshal
+import os
+import re
+import shutil
+import sqlite3
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager, nullcontext
+from dataclasses import dataclass
 from html import escape
+from typing import Optional
 
-# Load the research data
-with open('research.json', 'r') as f:
-    data = json.load(f)
+from pubmed_cache import PubMedCache, citation_label
 
-ingredients = data['ingredients']
-categories = data['categories']
-products = data['products']
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    from fontTools import subset as font_subset
+    from fontTools.ttLib import TTFont
+except ImportError:
+    font_subset = None
 
 # Scientific monochromatic color scheme
 category_colors = {
@@ -32,33 +55,596 @@ confidence_colors = {
     'Low': '#999999'
 }
 
-# Generate ingredient cards HTML
-def generate_cards():
-    cards_html = []
+# Evidence impact indicators; unlisted levels are shown as Low
+impact_colors = {
+    'High': '#1a1a1a',
+    'Medium': '#666666',
+    'Low': '#999999'
+}
+
+# Confidence levels missing from confidence_colors
+UNKNOWN_CONFIDENCE_COLOR = '#9ca3af'
+
+def slugify(text):
+    return re.sub(r'[^a-z0-9]+', '-', text.lower()).strip('-')
+
+# CSS class of every color table entry, so the markup names a class and the
+# colors are written once in the stylesheet
+category_classes = {cat: f'cat-{slugify(cat)}' for cat in category_colors}
+confidence_classes = {level: f'confidence-{slugify(level)}' for level in confidence_colors}
+impact_classes = {level: f'impact-{slugify(level)}' for level in impact_colors}
+
+def category_class(cat):
+    return category_classes.get(cat, category_classes['Other'])
+
+def confidence_class(level):
+    return confidence_classes.get(level, 'confidence-unknown')
+
+def impact_class(level):
+    return impact_classes.get(level, impact_classes['Low'])
+
+# Bump whenever render_card()/render_modal() output or the color tables change,
+# so fragments cached by earlier builds are not reused
+TEMPLATE_VERSION = '2'
+
+# Options controlling how the page is rendered
+@dataclass
+class BuildOptions:
+    modals: str = 'eager'
+    cache_dir: Optional[str] = None
+    jobs: int = 1
+    shard: str = 'none'
+    page_size: int = 500
+    pubmed_cache: Optional[str] = None
+    split_assets: bool = False
+    precompress: bool = False
+    minify: bool = False
+    payload: str = 'json'
+    grid: str = 'static'
+    search: str = 'main'
+    fonts: Optional[str] = None
+
+    # The virtual grid keeps the DOM small as the catalog grows, so its
+    # modals are always built on first open
+    def __post_init__(self):
+        if self.grid == 'virtual':
+            self.modals = 'lazy'
+
+# Copy of an ingredient whose evidence entries carry 'citations': the cached
+# PubMed citation label of each PMID (None when not cached), parallel to pmids
+def attach_citations(ing, labels):
+    ing = dict(ing)
+    evidence = []
+    for ev in ing['researchEvidence']:
+        ev = dict(ev)
+        ev['citations'] = [labels.get(str(pmid)) for pmid in ev.get('pmids', [])]
+        evidence.append(ev)
+    ing['researchEvidence'] = evidence
+    return ing
+
+# Re-iterable view applying transform(ing, *args) to every streamed
+# ingredient on each pass, so --stream input is never held in memory
+class IngredientMap:
+    def __init__(self, source, transform, *args):
+        self.source = source
+        self.transform = transform
+        self.args = args
+
+    def __iter__(self):
+        for ing in self.source:
+            yield self.transform(ing, *self.args)
+
+    def __len__(self):
+        return len(self.source)
+
+# Whether ingredients are read from the input again on every pass, as with
+# --stream and .jsonl input, rather than held in memory
+def is_streamed(ingredients):
+    return isinstance(ingredients, (IngredientStream, IngredientMap))
+
+# Preparation stage applying transform(ing, *args) to every ingredient:
+# loaded input is transformed once into a new list, streamed input through
+# an IngredientMap
+def map_ingredients(ingredients, transform, *args):
+    if is_streamed(ingredients):
+        return IngredientMap(ingredients, transform, *args)
+    return [transform(ing, *args) for ing in ingredients]
+
+# Attach citations from the SQLite cache written by pubmed_fetcher.py; one
+# query loads every label, so rendering never touches the network or disk
+def with_citations(data, cache_path):
+    if not os.path.exists(cache_path):
+        raise FileNotFoundError(f'PubMed cache {cache_path} does not exist; run pubmed_fetcher.py first')
+    with PubMedCache(cache_path) as cache:
+        labels = {pmid: citation_label(record) for pmid, record in cache.get_many().items()}
+    data = dict(data)
+    data['ingredients'] = map_ingredients(data['ingredients'], attach_citations, labels)
+    return data
+
+PUBMED_URL = 'https://pubmed.ncbi.nlm.nih.gov/{}/'
+PMC_URL = 'https://pmc.ncbi.nlm.nih.gov/articles/{}/'
+
+# Link for a reference id: a PMID, or a PubMed Central id such as PMC8191137
+def reference_url(ref_id):
+    return (PMC_URL if ref_id.startswith('PMC') else PUBMED_URL).format(ref_id)
+
+# Copy of an ingredient whose evidence 'refs' indices into the references
+# table are replaced by the referenced ids as 'pmids'
+def resolve_references(ing, ref_ids):
+    ing = dict(ing)
+    evidence = []
+    for ev in ing['researchEvidence']:
+        if 'refs' in ev:
+            ev = dict(ev)
+            ev['pmids'] = [ref_ids[i] for i in ev.pop('refs')]
+        evidence.append(ev)
+    ing['researchEvidence'] = evidence
+    return ing
+
+# Resolve evidence refs against the top-level references table; datasets
+# still storing pmids and urls on each evidence entry pass through unchanged
+def with_references(data):
+    if 'references' not in data:
+        return data
+    ref_ids = [ref['pmid'] if 'pmid' in ref else ref['pmcid'] for ref in data['references']]
+    data = dict(data)
+    data['ingredients'] = map_ingredients(data['ingredients'], resolve_references, ref_ids)
+    return data
+
+# Aggregate statistics of an ingredient's evidence: the rating shown on its
+# card and the fields the page can sort and filter by
+def compute_stats(ing):
+    evidence = ing['researchEvidence']
+    ratings = [ev['rating'] for ev in evidence]
+    return {
+        'meanRating': sum(ratings) / len(ratings) if ratings else 0,
+        'maxRating': max(ratings, default=0),
+        'minRating': min(ratings, default=0),
+        'evidenceCount': len(evidence),
+        'highConfidence': sum(1 for ev in evidence if ev.get('confidence') == 'High'),
+        'highImpact': sum(1 for ev in evidence if ev.get('impact') == 'High'),
+        'pmidCount': len({ref for ev in evidence for ref in ev.get('pmids', ev.get('refs', []))})
+    }
+
+# Copy of an ingredient carrying its 'stats', always computed from its
+# evidence so they cannot go stale
+def attach_stats(ing):
+    ing = dict(ing)
+    ing['stats'] = compute_stats(ing)
+    return ing
+
+# Aggregation stage: every later pass reads ing['stats'] instead of
+# recomputing them from the evidence
+def with_stats(data):
+    data = dict(data)
+    data['ingredients'] = map_ingredients(data['ingredients'], attach_stats)
+    return data
+
+# Characters read from the input per refill when streaming
+STREAM_CHUNK_SIZE = 1 << 16
+
+_decoder = json.JSONDecoder()
+
+# Incremental reader that decodes one JSON value at a time from a file
+class JsonStreamReader:
+    def __init__(self, f):
+        self.f = f
+        self.buf = ''
+        self.pos = 0
+        self.eof = False
+
+    def _fill(self):
+        if self.eof:
+            return False
+        chunk = self.f.read(STREAM_CHUNK_SIZE)
+        if not chunk:
+            self.eof = True
+            return False
+        self.buf = self.buf[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    # Next non-whitespace character without consuming it, '' at end of input
+    def peek(self):
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in ' \t\r\n':
+                self.pos += 1
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self._fill():
+                return ''
+
+    def expect(self, chars):
+        c = self.peek()
+        if not c or c not in chars:
+            raise ValueError(f"Expected one of {chars!r} but found {c or 'end of input'!r}")
+        self.pos += 1
+        return c
+
+    def value(self):
+        self.peek()
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError:
+                if not self._fill():
+                    raise
+                continue
+            # A number is only complete once a delimiter follows it,
+            # otherwise it may continue in the next chunk
+            if (isinstance(value, (int, float)) and not isinstance(value, bool)
+                    and (end == len(self.buf) or self.buf[end] not in ',]} \t\r\n')
+                    and self._fill()):
+                continue
+            self.pos = end
+            return value
+
+# Yield ('field', key, value) for each top-level field of a research.json
+# document and ('ingredient', None, ing) for each element of its ingredients
+# array, decoding one ingredient at a time
+def iter_json_document(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        reader = JsonStreamReader(f)
+        reader.expect('{')
+        if reader.peek() == '}':
+            return
+        while True:
+            key = reader.value()
+            reader.expect(':')
+            if key == 'ingredients':
+                reader.expect('[')
+                if reader.peek() == ']':
+                    reader.pos += 1
+                else:
+                    while True:
+                        yield 'ingredient', None, reader.value()
+                        if reader.expect(',]') == ']':
+                            break
+            else:
+                yield 'field', key, reader.value()
+            if reader.expect(',}') == '}':
+                return
+
+def iter_json_ingredients(path):
+    for kind, _, value in iter_json_document(path):
+        if kind == 'ingredient':
+            yield value
+
+# JSON Lines input: the first line holds every top-level field except
+# ingredients, each following line holds one ingredient
+def iter_jsonl_ingredients(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        f.readline()
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+# Re-iterable view of the ingredients that parses the input file again on
+# every pass, so peak memory stays flat as the dataset grows
+class IngredientStream:
+    def __init__(self, path, iterate, count=None):
+        self.path = path
+        self.iterate = iterate
+        self.count = count
+
+    def __iter__(self):
+        count = 0
+        for ing in self.iterate(self.path):
+            count += 1
+            yield ing
+        self.count = count
+
+    def __len__(self):
+        if self.count is None:
+            for _ in self:
+                pass
+        return self.count
+
+# Load the research data; with stream=True (always for .jsonl input) the
+# ingredients are decoded one record at a time on each pass instead of held in memory
+def load_data(path, stream=False):
+    if path.endswith('.jsonl'):
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.loads(f.readline())
+        data['ingredients'] = IngredientStream(path, iter_jsonl_ingredients)
+        return data
+    if not stream:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    data = {}
+    count = 0
+    for kind, key, value in iter_json_document(path):
+        if kind == 'field':
+            data[key] = value
+        else:
+            count += 1
+    data['ingredients'] = IngredientStream(path, iter_json_ingredients, count)
+    return data
+
+# Raised by validate_data() with every schema error found in a dataset
+class DatasetError(ValueError):
+    def __init__(self, errors):
+        self.errors = errors
+        super().__init__(f'{len(errors)} schema error{"s" if len(errors) != 1 else ""}:\n' +
+                         '\n'.join(f'  {error}' for error in errors))
+
+INGREDIENT_STRINGS = ('id', 'name', 'category', 'blueprintDosage', 'molecularFormula', 'description',
+                      'mechanism')
+INGREDIENT_STRING_LISTS = ('products', 'keyBenefits')
+EVIDENCE_STRINGS = ('benefit', 'description', 'clinicalDosage')
+SAFETY_STRING_LISTS = ('sideEffects', 'contraindications')
+
+# str.isdigit() alone also accepts non-ASCII digits such as '²'
+def _is_digits(value):
+    return value.isdigit() and value.isascii()
+
+# Ingredient ids are written unquoted into the page's onclick handlers
+_is_ingredient_id = _is_digits
+_is_pmid = _is_digits
+
+def _is_pmcid(value):
+    return value.startswith('PMC') and _is_digits(value[3:])
+
+# Highest evidence rating; cards show ratings out of this
+MAX_RATING = 10
+
+JSON_TYPE_NAMES = {str: 'a string', int: 'an integer', float: 'a number', bool: 'a boolean',
+                   list: 'an array', dict: 'an object', type(None): 'null'}
+
+# What obj holds under key, for error messages
+def _found(obj, key):
+    if key not in obj:
+        return 'missing'
+    value = obj[key]
+    return JSON_TYPE_NAMES.get(type(value), type(value).__name__)
+
+# The value under key, for error messages about values rather than types
+def _found_value(obj, key):
+    return repr(obj[key]) if key in obj else 'missing'
+
+def _is_string_list(value):
+    return type(value) is list and all(type(item) is str for item in value)
+
+# The schema error in references[i], or None if it holds a PMCID that is
+# not in seen, the first position of every id so far; records the id there
+def _reference_error(ref, i, seen):
+    if type(ref) is not dict or ('pmid' in ref) == ('pmcid' in ref):
+        return f'references[{i}]: expected an object with either a pmid or a pmcid'
+    key, is_valid = ('pmid', _is_pmid) if 'pmid' in ref else ('pmcid', _is_pmcid)
+    ref_id = ref[key]
+    if type(ref_id) is not str or not is_valid(ref_id):
+        return f'references[{i}].{key}: expected a {key.upper()} string, found {ref_id!r}'
+    first = seen.setdefault(ref_id, i)
+    if first != i:
+        return f'references[{i}].{key}: {ref_id} is already references[{first}]'
+    return None
+
+# Whether value is an array of PMID or PMCID strings. Most arrays hold
+# PMIDs only, which one check of their joined digits accepts
+def _is_reference_id_list(value):
+    if type(value) is not list:
+        return False
+    try:
+        digits = ''.join(value)
+    except TypeError:
+        return False
+    if digits.isdigit() and digits.isascii() and all(value):
+        return True
+    return all(_is_pmid(ref_id) or _is_pmcid(ref_id) for ref_id in value)
+
+PUBMED_URL_PREFIX, _, PUBMED_URL_SUFFIX = PUBMED_URL.partition('{}')
+
+# Append to errors the problems in the pmids and urls of evidence entry j
+# of ingredient i, which cites them directly instead of through refs
+def _check_pmids(errors, ev, i, j):
+    pmids = ev['pmids']
+    if not _is_reference_id_list(pmids):
+        errors.append(f'ingredients[{i}].researchEvidence[{j}].pmids: expected an array of PMID or PMCID '
+                      f'strings, found {pmids!r}')
+        return
+    if 'urls' not in ev:
+        return
+    urls = ev['urls']
+    if type(urls) is not list or len(urls) != len(pmids):
+        errors.append(f'ingredients[{i}].researchEvidence[{j}].urls: expected an array of one url per pmid, '
+                      f'found {urls!r}')
+        return
+    # Usually every url is the PubMed URL of its pmid: the joined urls then
+    # equal the joined expected URLs, and no url can span a newline since
+    # pmids have none
+    try:
+        if '\n'.join(urls) == (PUBMED_URL_PREFIX + (PUBMED_URL_SUFFIX + '\n' + PUBMED_URL_PREFIX).join(pmids)
+                               + PUBMED_URL_SUFFIX):
+            return
+    except TypeError:
+        pass
+    # Older datasets list PubMed Central articles by the digits of their PMCID
+    for k, (pmid, url) in enumerate(zip(pmids, urls)):
+        if type(url) is not str or not url.rstrip('/').endswith(('/' + pmid, '/PMC' + pmid)):
+            errors.append(f'ingredients[{i}].researchEvidence[{j}].urls[{k}]: {url!r} does not link to {pmid}')
+
+# Append to errors every schema error in the ingredient at position i, and
+# record its id in ids. This runs for every field of every record on each
+# build, so the checks are plain loops and comparisons: helper calls and
+# map() over lists of two or three items cost more than the checks themselves
+def _check_ingredient(errors, ing, i, ids, categories, products, ref_count):
+    if type(ing) is not dict:
+        errors.append(f'ingredients[{i}]: expected an object, found {JSON_TYPE_NAMES.get(type(ing), "?")}')
+        return
+    for key in INGREDIENT_STRINGS:
+        if type(ing.get(key)) is not str:
+            errors.append(f'ingredients[{i}].{key}: expected a string, found {_found(ing, key)}')
+    for key in INGREDIENT_STRING_LISTS:
+        value = ing.get(key)
+        if type(value) is list:
+            for item in value:
+                if type(item) is not str:
+                    break
+            else:
+                continue
+        errors.append(f'ingredients[{i}].{key}: expected an array of strings, found {_found(ing, key)}')
+
+    ing_id = ing.get('id')
+    if type(ing_id) is str:
+        if ing_id in ids:
+            errors.append(f'ingredients[{i}].id: {ing_id} is already the id of ingredients[{ids[ing_id]}]')
+        elif not _is_ingredient_id(ing_id):
+            errors.append(f'ingredients[{i}].id: expected a string of digits, found {ing_id!r}')
+        ids[ing_id] = i
+    category = ing.get('category')
+    if categories is not None and type(category) is str and category not in categories:
+        errors.append(f'ingredients[{i}].category: {category!r} is not listed in categories')
+    if products is not None and type(ing.get('products')) is list:
+        for product in ing['products']:
+            if type(product) is str and product not in products:
+                errors.append(f'ingredients[{i}].products: {product!r} is not listed in products')
+
+    safety = ing.get('safety')
+    if type(safety) is not dict:
+        errors.append(f'ingredients[{i}].safety: expected an object, found {_found(ing, "safety")}')
+    else:
+        if type(safety.get('maxSafeDosage')) is not str:
+            errors.append(f'ingredients[{i}].safety.maxSafeDosage: expected a string, '
+                          f'found {_found(safety, "maxSafeDosage")}')
+        for key in SAFETY_STRING_LISTS:
+            value = safety.get(key)
+            if type(value) is list:
+                for item in value:
+                    if type(item) is not str:
+                        break
+                else:
+                    continue
+            errors.append(f'ingredients[{i}].safety.{key}: expected an array of strings, '
+                          f'found {_found(safety, key)}')
+
+    evidence = ing.get('researchEvidence')
+    if type(evidence) is not list:
+        errors.append(f'ingredients[{i}].researchEvidence: expected an array, '
+                      f'found {_found(ing, "researchEvidence")}')
+        return
+    for j, ev in enumerate(evidence):
+        if type(ev) is not dict:
+            errors.append(f'ingredients[{i}].researchEvidence[{j}]: expected an object, '
+                          f'found {JSON_TYPE_NAMES.get(type(ev), "?")}')
+            continue
+        for key in EVIDENCE_STRINGS:
+            if type(ev.get(key)) is not str:
+                errors.append(f'ingredients[{i}].researchEvidence[{j}].{key}: expected a string, '
+                              f'found {_found(ev, key)}')
+        rating = ev.get('rating')
+        if type(rating) is not int or not 0 <= rating <= MAX_RATING:
+            errors.append(f'ingredients[{i}].researchEvidence[{j}].rating: expected an integer from 0 to '
+                          f'{MAX_RATING}, found {_found_value(ev, "rating")}')
+        impact = ev.get('impact')
+        if type(impact) is not str or impact not in impact_colors:
+            errors.append(f'ingredients[{i}].researchEvidence[{j}].impact: expected one of '
+                          f'{", ".join(impact_colors)}, found {_found_value(ev, "impact")}')
+        confidence = ev.get('confidence')
+        if type(confidence) is not str or confidence not in confidence_colors:
+            errors.append(f'ingredients[{i}].researchEvidence[{j}].confidence: expected one of '
+                          f'{", ".join(confidence_colors)}, found {_found_value(ev, "confidence")}')
+
+        if 'refs' in ev:
+            refs = ev['refs']
+            if 'pmids' in ev or 'urls' in ev:
+                errors.append(f'ingredients[{i}].researchEvidence[{j}]: refs cannot be combined '
+                              f'with pmids or urls')
+            elif ref_count is None:
+                errors.append(f'ingredients[{i}].researchEvidence[{j}].refs: the dataset has no '
+                              f'references table')
+            else:
+                if type(refs) is list:
+                    for ref in refs:
+                        if type(ref) is not int or not 0 <= ref < ref_count:
+                            break
+                    else:
+                        continue
+                errors.append(f'ingredients[{i}].researchEvidence[{j}].refs: expected an array of indices '
+                              f'into references (0 to {ref_count - 1}), found {refs!r}')
+        elif 'pmids' in ev:
+            _check_pmids(errors, ev, i, j)
+        elif 'urls' in ev:
+            errors.append(f'ingredients[{i}].researchEvidence[{j}].urls: urls need the pmids they link to')
+
+# Check every field the renderer reads in one pass over the dataset: types,
+# impact and confidence levels, categories and products against the
+# top-level lists, unique ingredient ids and reference ids, refs within the
+# references table and urls matching their pmids. Ingredients are read one
+# record at a time, so streamed input is decoded once. Raises DatasetError listing
+# every problem rather than stopping at the first
+def validate_data(data):
+    errors = []
+    for key in ('version', 'lastUpdated', 'description', 'disclaimer'):
+        if type(data.get(key)) is not str:
+            errors.append(f'{key}: expected a string, found {_found(data, key)}')
+    if type(data.get('totalIngredients')) is not int:
+        errors.append(f'totalIngredients: expected an integer, found {_found(data, "totalIngredients")}')
+    for key in ('categories', 'products'):
+        if not _is_string_list(data.get(key)):
+            errors.append(f'{key}: expected an array of strings, found {_found(data, key)}')
+    categories = set(data['categories']) if _is_string_list(data.get('categories')) else None
+    products = set(data['products']) if _is_string_list(data.get('products')) else None
+
+    ref_count = None
+    if 'references' in data:
+        references = data['references']
+        if type(references) is not list:
+            errors.append(f'references: expected an array, found {_found(data, "references")}')
+        else:
+            ref_count = len(references)
+            seen = {}
+            for i, ref in enumerate(references):
+                # A new PMID passes this test; PMCIDs and errors are left to _reference_error()
+                ref_id = ref.get('pmid') if type(ref) is dict and 'pmcid' not in ref else None
+                if type(ref_id) is str and _is_digits(ref_id) and seen.setdefault(ref_id, i) == i:
+                    continue
+                error = _reference_error(ref, i, seen)
+                if error:
+                    errors.append(error)
+
+    ingredients = data.get('ingredients')
+    if isinstance(ingredients, (str, dict)) or not hasattr(ingredients, '__iter__'):
+        errors.append(f'ingredients: expected an array, found {_found(data, "ingredients")}')
+        ingredients = ()
+    ids = {}
+    count = 0
     for ing in ingredients:
-        cat = ing['category']
-        colors = category_colors.get(cat, category_colors['Other'])
-        
-        # Get first benefit description truncated
-        first_benefit = ing['keyBenefits'][0] if ing['keyBenefits'] else ''
-        
-        # Calculate average rating
-        ratings = [ev['rating'] for ev in ing['researchEvidence']]
-        avg_rating = sum(ratings) / len(ratings) if ratings else 0
-        
-        # Generate star rating
-        stars = '★' * int(round(avg_rating / 2)) + '☆' * (5 - int(round(avg_rating / 2)))
-        
-        # Products tags
-        product_tags = ''.join([
-            f'<span class="product-tag">{escape(p)}</span>' 
-            for p in ing['products']
-        ])
-        
-        card = f'''
-        <div class="ingredient-card" data-category="{escape(cat)}" data-id="{ing['id']}" onclick="openModal({ing['id']})">
-            <div class="card-header" style="background: linear-gradient(135deg, {colors['bg']}, white);">
-                <span class="category-badge" style="background-color: {colors['bg']}; color: {colors['text']}; border: 1px solid {colors['border']};">
+        _check_ingredient(errors, ing, count, ids, categories, products, ref_count)
+        count += 1
+
+    if type(data.get('totalIngredients')) is int and data['totalIngredients'] != count:
+        errors.append(f'totalIngredients: {data["totalIngredients"]}, but the dataset has {count} ingredients')
+    if errors:
+        raise DatasetError(errors)
+
+# Average evidence rating out of 10 and the number of filled stars out of 5
+def card_rating(ing):
+    avg_rating = ing['stats']['meanRating']
+    return avg_rating, int(round(avg_rating / 2))
+
+# Generate ingredient cards HTML
+def render_card(ing):
+    cat = ing['category']
+    
+    # Get first benefit description truncated
+    first_benefit = ing['keyBenefits'][0] if ing['keyBenefits'] else ''
+    
+    # Calculate average rating
+    avg_rating, filled = card_rating(ing)
+    
+    # Generate star rating
+    stars = '★' * filled + '☆' * (5 - filled)
+    
+    # Products tags
+    product_tags = ''.join([
+        f'<span class="product-tag">{escape(p)}</span>' 
+        for p in ing['products']
+    ])
+    
+    card = f'''
+        <div class="ingredient-card {category_class(cat)}" data-category="{escape(cat)}" data-id="{ing['id']}" onclick="openModal({ing['id']})">
+            <div class="card-header">
+                <span class="category-badge">
                     {escape(cat)}
                 </span>
                 <h3 class="card-title">{escape(ing['name'])}</h3>
@@ -79,40 +665,39 @@ def generate_cards():
             </div>
         </div>
         '''
-        cards_html.append(card)
-    return '\n'.join(cards_html)
+    return card
+
+# Tooltip attribute for the i-th reference link when its citation is known
+def ref_title(citations, i):
+    citation = citations[i] if i < len(citations) else None
+    return f' title="{escape(citation)}"' if citation else ''
 
 # Generate modal content for each ingredient
-def generate_modals():
-    modals_html = []
-    for ing in ingredients:
-        cat = ing['category']
-        colors = category_colors.get(cat, category_colors['Other'])
-        
-        # Research evidence
-        evidence_html = []
-        for ev in ing['researchEvidence']:
-            conf_color = confidence_colors.get(ev['confidence'], '#9ca3af')
-            impact_color = '#1a1a1a' if ev['impact'] == 'High' else '#666666' if ev['impact'] == 'Medium' else '#999999'
-            
-            # Use URLs from the research evidence
-            urls = ev.get('urls', [])
-            if urls:
-                ref_links = ' '.join([
-                    f'<a href="{escape(url)}" target="_blank" class="ref-link">[{i+1}]</a>'
-                    for i, url in enumerate(urls)
-                ])
-            else:
-                ref_links = '<span class="no-refs">No references available</span>'
-            
-            evidence_html.append(f'''
+def render_modal(ing):
+    cat = ing['category']
+    
+    # Research evidence
+    evidence_html = []
+    for ev in ing['researchEvidence']:
+        # URLs are derived from the reference ids unless the dataset stores them
+        urls = ev['urls'] if 'urls' in ev else [reference_url(p) for p in ev.get('pmids', [])]
+        citations = ev.get('citations', [])
+        if urls:
+            ref_links = ' '.join([
+                f'<a href="{escape(url)}" target="_blank" class="ref-link"{ref_title(citations, i)}>[{i+1}]</a>'
+                for i, url in enumerate(urls)
+            ])
+        else:
+            ref_links = '<span class="no-refs">No references available</span>'
+        
+        evidence_html.append(f'''
             <div class="evidence-item">
                 <div class="evidence-header">
                     <h4>{escape(ev['benefit'])}</h4>
                     <div class="evidence-metrics">
                         <span class="rating-badge">{ev['rating']}/10</span>
-                        <span class="impact-badge" style="border-color: {impact_color}; color: {impact_color};">{ev['impact']} Impact</span>
-                        <span class="confidence-badge" style="border-color: {conf_color}; color: {conf_color};">{ev['confidence']} Confidence</span>
+                        <span class="impact-badge {impact_class(ev['impact'])}">{ev['impact']} Impact</span>
+                        <span class="confidence-badge {confidence_class(ev['confidence'])}">{ev['confidence']} Confidence</span>
                     </div>
                 </div>
                 <p class="evidence-description">{escape(ev['description'])}</p>
@@ -122,18 +707,18 @@ def generate_modals():
                 </div>
             </div>
             ''')
-        
-        # Safety info
-        safety = ing['safety']
-        side_effects = ', '.join(safety['sideEffects']) if safety['sideEffects'] else 'None reported'
-        contraindications = ', '.join(safety['contraindications']) if safety['contraindications'] else 'None'
-        
-        modal = f'''
-        <div id="modal-{ing['id']}" class="modal">
+    
+    # Safety info
+    safety = ing['safety']
+    side_effects = ', '.join(safety['sideEffects']) if safety['sideEffects'] else 'None reported'
+    contraindications = ', '.join(safety['contraindications']) if safety['contraindications'] else 'None'
+    
+    modal = f'''
+        <div id="modal-{ing['id']}" class="modal {category_class(cat)}">
             <div class="modal-content">
-                <div class="modal-header" style="background: linear-gradient(135deg, {colors['bg']}, white);">
+                <div class="modal-header">
                     <button class="close-btn" onclick="closeModal({ing['id']})">&times;</button>
-                    <span class="category-badge" style="background-color: {colors['bg']}; color: {colors['text']}; border: 1px solid {colors['border']};">
+                    <span class="category-badge">
                         {escape(cat)}
                     </span>
                     <h2>{escape(ing['name'])}</h2>
@@ -193,41 +778,548 @@ def generate_modals():
             </div>
         </div>
         '''
-        modals_html.append(modal)
-    return '\n'.join(modals_html)
+    return modal
+
+# Shared lookup/render/store flow of the fragment caches; subclasses map an
+# ingredient to a cache key and hold the fragments. Only newly rendered
+# fragments are stored
+class BaseFragmentCache:
+    rendered = 0
+
+    # (key, html) of each ingredient's cached fragment, in order; html is
+    # None where the fragment has to be rendered
+    def lookup_all(self, kind, ingredients):
+        for ing in ingredients:
+            yield self.lookup(kind, ing)
+
+    def fragments(self, kind, ingredients, render):
+        for ing, (key, html) in zip(ingredients, self.lookup_all(kind, ingredients)):
+            if html is None:
+                html = render(ing)
+                self.rendered += 1
+                self.store(key, html)
+            yield html
+
+FRAGMENT_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS fragments (
+    digest TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    html TEXT NOT NULL,
+    PRIMARY KEY (digest, kind)
+)
+'''
+
+# Rendered card/modal fragments from earlier builds in an SQLite file, keyed
+# by a hash of the ingredient and TEMPLATE_VERSION; only changed ingredients
+# are re-rendered. Each ingredient is hashed once per build, and one query
+# per kind of fragment streams the cached ones back in page order, so only
+# the hashes and newly rendered fragments stay in memory
+class FragmentCache(BaseFragmentCache):
+    def __init__(self, cache_dir):
+        os.makedirs(cache_dir, exist_ok=True)
+        self.path = os.path.join(cache_dir, 'fragments.sqlite')
+        self.db = sqlite3.connect(self.path)
+        self.db.execute(FRAGMENT_SCHEMA)
+        self.db.execute('CREATE TEMP TABLE wanted (pos INTEGER PRIMARY KEY, digest TEXT NOT NULL)')
+        self.digests = {}
+        self.wanted = None
+        self.pending = []
+
+    # marshal format 2, which has no back-references, is a stable
+    # serialization of the decoded JSON and several times cheaper than repr()
+    # or json.dumps(); a reordered key only costs a re-render
+    def digest(self, ing):
+        digest = self.digests.get(ing['id'])
+        if digest is None:
+            digest = hashlib.sha256(TEMPLATE_VERSION.encode() + marshal.dumps(ing, 2)).hexdigest()
+            self.digests[ing['id']] = digest
+        return digest
+
+    # Cards and modals of a page look up the same ingredients, which are
+    # hashed into the wanted table once
+    def lookup_all(self, kind, ingredients):
+        if ingredients is not self.wanted:
+            self.db.execute('DELETE FROM wanted')
+            self.db.executemany('INSERT INTO wanted VALUES (?, ?)', enumerate(map(self.digest, ingredients)))
+            self.wanted = ingredients
+        rows = self.db.execute('SELECT wanted.digest, fragments.html FROM wanted LEFT JOIN fragments '
+                               'ON fragments.digest = wanted.digest AND fragments.kind = ? '
+                               'ORDER BY wanted.pos', (kind,))
+        for digest, html in rows:
+            yield (digest, kind), html
+
+    # Written by save(), so no insert runs while lookup_all() reads
+    def store(self, key, html):
+        self.pending.append((*key, html))
+
+    # Commit the fragments rendered by this build, dropping those of
+    # ingredients it did not use
+    def save(self):
+        with self.db:
+            self.db.executemany('INSERT OR REPLACE INTO fragments VALUES (?, ?, ?)', self.pending)
+            self.db.execute('CREATE TEMP TABLE IF NOT EXISTS used (digest TEXT PRIMARY KEY)')
+            self.db.execute('DELETE FROM used')
+            self.db.executemany('INSERT INTO used VALUES (?)', ((d,) for d in set(self.digests.values())))
+            self.db.execute('DELETE FROM fragments WHERE digest NOT IN (SELECT digest FROM used)')
+        self.digests = {}
+        self.wanted = None
+        self.pending = []
+
+    def close(self):
+        self.db.close()
+
+# In-memory fragments for --watch: ingredients are diffed by id against the
+# previous build, so unchanged ones are reused without hashing
+class IngredientDiffCache(BaseFragmentCache):
+    def __init__(self):
+        self.entries = {}
+        self.used = {}
+        self.changed = set()
+        self.last_changed = set()
+
+    def lookup(self, kind, ing):
+        entry = self.used.get(ing['id'])
+        if entry is None:
+            entry = self.entries.get(ing['id'])
+            if entry is None or entry[0] != ing:
+                entry = (ing, {})
+                self.changed.add(ing['id'])
+            self.used[ing['id']] = entry
+        return (ing['id'], kind), entry[1].get(kind)
+
+    def store(self, key, html):
+        ing_id, kind = key
+        self.used[ing_id][1][kind] = html
+
+    def save(self):
+        self.entries = self.used
+        self.used = {}
+        self.last_changed = self.changed
+        self.changed = set()
+
+# Ingredients sent to a worker process per task with --jobs
+PARALLEL_CHUNKSIZE = 32
+
+# Render fragments across worker processes; Executor.map keeps input order,
+# so the page is byte-identical to a serial build
+def render_parallel(kind, ingredients, render, cache, pool):
+    if cache is None:
+        return pool.map(render, ingredients, chunksize=PARALLEL_CHUNKSIZE)
+    lookups = [(ing, key, html) for ing, (key, html) in zip(ingredients, cache.lookup_all(kind, ingredients))]
+    misses = [ing for ing, _, html in lookups if html is None]
+    rendered = pool.map(render, misses, chunksize=PARALLEL_CHUNKSIZE)
+    fragments = []
+    for ing, key, html in lookups:
+        if html is None:
+            html = next(rendered)
+            cache.rendered += 1
+            cache.store(key, html)
+        fragments.append(html)
+    return fragments
+
+# Yield one rendered fragment per ingredient, newline separated
+def generate_fragments(kind, ingredients, render, cache=None, pool=None):
+    if pool is not None:
+        fragments = render_parallel(kind, ingredients, render, cache, pool)
+    elif cache is not None:
+        fragments = cache.fragments(kind, ingredients, render)
+    else:
+        fragments = map(render, ingredients)
+    for i, html in enumerate(fragments):
+        if i:
+            yield '\n'
+        yield html
+
+def generate_cards(ingredients, cache=None, pool=None):
+    return generate_fragments('card', ingredients, render_card, cache, pool)
+
+def generate_modals(ingredients, cache=None, pool=None):
+    return generate_fragments('modal', ingredients, render_modal, cache, pool)
+
+# Yield a JSON object from (key, value) pairs one entry at a time, matching json.dumps
+def generate_json_object(items):
+    yield '{'
+    sep = ''
+    for key, value in items:
+        yield f'{sep}{json.dumps(key, ensure_ascii=False)}: {json.dumps(value, ensure_ascii=False)}'
+        sep = ', '
+    yield '}'
 
-# Generate category filter buttons
-def generate_category_filters():
+# Positions in page order of the ingredients in each listed category and
+# product; gives the filter buttons their counts and the page its facet bitsets
+def build_facets(ingredients, categories, products):
+    facets = {
+        'categories': {cat: [] for cat in categories},
+        'products': {prod: [] for prod in products}
+    }
+    for pos, ing in enumerate(ingredients):
+        positions = facets['categories'].get(ing['category'])
+        if positions is not None:
+            positions.append(pos)
+        for prod in dict.fromkeys(ing['products']):
+            positions = facets['products'].get(prod)
+            if positions is not None:
+                positions.append(pos)
+    return facets
+
+def generate_facet_index(facets):
+    return json.dumps(facets, separators=(',', ':'), ensure_ascii=False)
+
+# Statistics the page can sort by, with their labels in the sort select
+SORT_FIELDS = {
+    'meanRating': 'Mean rating',
+    'maxRating': 'Best rating',
+    'minRating': 'Lowest rating',
+    'evidenceCount': 'Evidence entries',
+    'highConfidence': 'High-confidence evidence',
+    'highImpact': 'High-impact evidence',
+    'pmidCount': 'Distinct references'
+}
+
+# Minimum mean ratings offered by the rating filter
+RATING_THRESHOLDS = [5, 6, 7, 8, 9]
+
+# Positions ranked by each of SORT_FIELDS, highest first with ties in page
+# order, and the mean ratings as shown on the cards. Positions passing a
+# rating threshold are a prefix of the mean rating ranking
+def generate_stats_index(ingredients):
+    columns = {field: [] for field in SORT_FIELDS}
+    for ing in ingredients:
+        stats = ing['stats']
+        for field, values in columns.items():
+            values.append(stats[field])
+    return json.dumps({
+        'meanRating': [round(rating, 1) for rating in columns['meanRating']],
+        'orders': {field: sorted(range(len(values)), key=lambda pos: -values[pos])
+                   for field, values in columns.items()}
+    }, separators=(',', ':'))
+
+# Word tokens for the search index; the page script tokenizes queries the same way
+TOKEN_RE = re.compile(r'[^\W_]+')
+
+def tokenize(text):
+    return TOKEN_RE.findall(text.lower())
+
+# Build the inverted search index: sorted tokens with parallel posting lists
+# of ingredient positions, so the page can prefix-match by binary search
+def generate_search_index(ingredients):
+    postings = {}
+    for pos, ing in enumerate(ingredients):
+        fields = [ing['name'], ing['category'], ing['description'], ing['mechanism']]
+        fields.extend(ing['keyBenefits'])
+        for ev in ing['researchEvidence']:
+            fields.append(ev['benefit'])
+            fields.append(ev['description'])
+        for token in set(tokenize(' '.join(fields))):
+            postings.setdefault(token, []).append(pos)
+    tokens = sorted(postings)
+    return json.dumps({
+        'ids': [ing['id'] for ing in ingredients],
+        'tokens': tokens,
+        'postings': [postings[t] for t in tokens]
+    }, separators=(',', ':'), ensure_ascii=False)
+
+# Matches html.escape(), for markup the page builds from embedded data
+ESCAPE_HTML_SCRIPT = """
+        function escapeHtml(value) {
+            return String(value).replace(/[&<>"']/g, c => ({
+                '&': '&amp;', '<': '&lt;', '>': '&gt;', '"': '&quot;', "'": '&#x27;'
+            })[c]);
+        }
+"""
+
+# Builds a modal's DOM from the embedded ingredient data on first open;
+# mirrors the markup of generate_modals()
+LAZY_MODAL_SCRIPT = """
+        function referenceUrl(id) {
+            return id.startsWith('PMC')
+                ? `https://pmc.ncbi.nlm.nih.gov/articles/${id}/`
+                : `https://pubmed.ncbi.nlm.nih.gov/${id}/`;
+        }
+        
+        function buildModal(ing) {
+            const evidence = ing.researchEvidence.map(ev => {
+                const confClass = colorClasses.confidence[ev.confidence] || 'confidence-unknown';
+                const impactClass = colorClasses.impact[ev.impact] || colorClasses.impact['Low'];
+                const urls = ev.urls || (ev.pmids || []).map(referenceUrl);
+                const citations = ev.citations || [];
+                const refLinks = urls.length
+                    ? urls.map((url, i) => {
+                        const title = citations[i] ? ` title="${escapeHtml(citations[i])}"` : '';
+                        return `<a href="${escapeHtml(url)}" target="_blank" class="ref-link"${title}>[${i + 1}]</a>`;
+                    }).join(' ')
+                    : '<span class="no-refs">No references available</span>';
+                return `
+                <div class="evidence-item">
+                    <div class="evidence-header">
+                        <h4>${escapeHtml(ev.benefit)}</h4>
+                        <div class="evidence-metrics">
+                            <span class="rating-badge">${ev.rating}/10</span>
+                            <span class="impact-badge ${impactClass}">${ev.impact} Impact</span>
+                            <span class="confidence-badge ${confClass}">${ev.confidence} Confidence</span>
+                        </div>
+                    </div>
+                    <p class="evidence-description">${escapeHtml(ev.description)}</p>
+                    <div class="evidence-footer">
+                        <span class="dosage-info">Clinical dosage: <strong>${escapeHtml(ev.clinicalDosage)}</strong></span>
+                        <div class="refs">References: ${refLinks}</div>
+                    </div>
+                </div>`;
+            }).join('');
+            const safety = ing.safety;
+            const sideEffects = safety.sideEffects.length ? safety.sideEffects.join(', ') : 'None reported';
+            const contraindications = safety.contraindications.length ? safety.contraindications.join(', ') : 'None';
+            
+            const modal = document.createElement('div');
+            modal.id = 'modal-' + ing.id;
+            modal.className = 'modal ' + (colorClasses.category[ing.category] || colorClasses.category['Other']);
+            modal.innerHTML = `
+                <div class="modal-content">
+                    <div class="modal-header">
+                        <button class="close-btn" onclick="closeModal(${ing.id})">&times;</button>
+                        <span class="category-badge">${escapeHtml(ing.category)}</span>
+                        <h2>${escapeHtml(ing.name)}</h2>
+                        <p class="molecular-formula">${escapeHtml(ing.molecularFormula)}</p>
+                        <p class="modal-dosage">Blueprint dosage: ${escapeHtml(ing.blueprintDosage)}</p>
+                    </div>
+                    <div class="modal-body">
+                        <section class="info-section">
+                            <h3>Description</h3>
+                            <p>${escapeHtml(ing.description)}</p>
+                        </section>
+                        <section class="info-section">
+                            <h3>Mechanism</h3>
+                            <p>${escapeHtml(ing.mechanism)}</p>
+                        </section>
+                        <section class="info-section">
+                            <h3>Key Benefits</h3>
+                            <div class="benefits-list">
+                                ${ing.keyBenefits.map(b => `<span class="benefit-tag large">${escapeHtml(b)}</span>`).join('')}
+                            </div>
+                        </section>
+                        <section class="info-section">
+                            <h3>Products</h3>
+                            <div class="products-list">
+                                ${ing.products.map(p => `<span class="product-tag large">${escapeHtml(p)}</span>`).join('')}
+                            </div>
+                        </section>
+                        <section class="info-section">
+                            <h3>Research Evidence</h3>
+                            <div class="evidence-list">${evidence}</div>
+                        </section>
+                        <section class="info-section safety-section">
+                            <h3>Safety Information</h3>
+                            <div class="safety-grid">
+                                <div class="safety-item">
+                                    <span class="safety-label">Side Effects</span>
+                                    <span class="safety-value">${escapeHtml(sideEffects)}</span>
+                                </div>
+                                <div class="safety-item">
+                                    <span class="safety-label">Contraindications</span>
+                                    <span class="safety-value">${escapeHtml(contraindications)}</span>
+                                </div>
+                                <div class="safety-item">
+                                    <span class="safety-label">Max Safe Dosage</span>
+                                    <span class="safety-value highlight">${escapeHtml(safety.maxSafeDosage)}</span>
+                                </div>
+                            </div>
+                        </section>
+                    </div>
+                </div>`;
+            return modal;
+        }
+        
+        // Modals are built on first open and stay in the DOM as a cache
+        function getModal(id) {
+            let modal = document.getElementById('modal-' + id);
+            if (!modal) {
+                modal = buildModal(modalRecord(id));
+                document.querySelector('.container').appendChild(modal);
+            }
+            return modal;
+        }
+"""
+
+EAGER_MODAL_SCRIPT = """
+        function getModal(id) {
+            return document.getElementById('modal-' + id);
+        }
+"""
+
+# Record lookup for lazy modals with --payload json: modalData maps id -> record
+JSON_RECORDS_SCRIPT = """
+        function modalRecord(id) {
+            return modalData[id];
+        }
+"""
+
+# Record lookup for lazy modals with --payload columnar: modalPayload is
+# expanded back into id -> record on the first modal opened
+COLUMNAR_RECORDS_SCRIPT = """
+        function decodeColumn(column, strings) {
+            if (column.t === 's') return column.v.map(code => strings[code]);
+            if (column.t === 'o') return decodeTable(column.v, strings);
+            if (column.t === 'l') {
+                const flat = decodeColumn(column.v, strings);
+                let pos = 0;
+                return column.n.map(count => flat.slice(pos, pos += count));
+            }
+            return column.v;
+        }
+        
+        function decodeTable(table, strings) {
+            const rows = Array.from({length: table.n}, () => ({}));
+            table.k.forEach((key, j) => {
+                const column = table.c[j];
+                const absent = new Set(column.a || []);
+                const values = decodeColumn(column, strings);
+                let next = 0;
+                rows.forEach((row, i) => {
+                    if (!absent.has(i)) row[key] = values[next++];
+                });
+            });
+            return rows;
+        }
+        
+        let modalData = null;
+        function modalRecord(id) {
+            if (modalData === null) {
+                modalData = {};
+                decodeTable(modalPayload.records, modalPayload.strings).forEach(ing => {
+                    modalData[ing.id] = ing;
+                });
+            }
+            return modalData[id];
+        }
+"""
+
+# A string column is coded through the shared string table when it has at
+# most this many distinct values per value, i.e. its values repeat
+STRING_TABLE_RATIO = 0.5
+
+# Columnar encoding of a list of records for --payload columnar. Each table
+# is {n: rows, k: keys, c: columns}; a column is typed 's' (codes into the
+# string table), 'l' (per-row counts over a flattened column), 'o' (a nested
+# table) or 'v' (plain values), and lists in 'a' the rows missing its key
+class ColumnarEncoder:
+    def __init__(self):
+        self.strings = []
+        self.codes = {}
+
+    def code(self, value):
+        code = self.codes.get(value)
+        if code is None:
+            code = self.codes[value] = len(self.strings)
+            self.strings.append(value)
+        return code
+
+    def column(self, values):
+        if values and all(isinstance(v, dict) for v in values):
+            return {'t': 'o', 'v': self.table(values)}
+        if values and all(isinstance(v, list) for v in values):
+            flat = [item for v in values for item in v]
+            return {'t': 'l', 'n': [len(v) for v in values], 'v': self.column(flat)}
+        if values and all(isinstance(v, str) for v in values) \
+                and len(set(values)) <= len(values) * STRING_TABLE_RATIO:
+            return {'t': 's', 'v': [self.code(v) for v in values]}
+        return {'t': 'v', 'v': values}
+
+    def table(self, rows):
+        keys = list(dict.fromkeys(key for row in rows for key in row))
+        columns = []
+        for key in keys:
+            column = self.column([row[key] for row in rows if key in row])
+            absent = [i for i, row in enumerate(rows) if key not in row]
+            if absent:
+                column['a'] = absent
+            columns.append(column)
+        return {'n': len(rows), 'k': keys, 'c': columns}
+
+def generate_columnar_payload(ingredients):
+    encoder = ColumnarEncoder()
+    records = encoder.table(list(ingredients))
+    return json.dumps({'strings': encoder.strings, 'records': records},
+                      separators=(',', ':'), ensure_ascii=False)
+
+# Records lazy modals are built from; eager modals are already in the page
+def generate_modal_data(ingredients, options):
+    if options.modals == 'eager':
+        return
+    if options.payload == 'columnar':
+        yield f"\n        const modalPayload = {generate_columnar_payload(ingredients)}"
+    else:
+        yield "\n        const modalData = "
+        yield from generate_json_object((ing['id'], ing) for ing in ingredients)
+    classes = {'category': category_classes, 'confidence': confidence_classes, 'impact': impact_classes}
+    yield f";\n        const colorClasses = {json.dumps(classes)};"
+
+# Cards rendered into the page with --grid virtual, as the first screenful and
+# the fallback without JavaScript; the script creates the rest as they scroll
+# into view
+VIRTUAL_INITIAL_CARDS = 24
+
+# What the virtual grid renders a card from, in render_card() order:
+# [id, category, name, dosage, description start, filled stars, rating, benefits, products]
+def card_row(ing):
+    avg_rating, filled = card_rating(ing)
+    return [ing['id'], ing['category'], ing['name'], ing['blueprintDosage'], ing['description'][:120],
+            filled, f'{avg_rating:.1f}', ing['keyBenefits'][:3], ing['products']]
+
+# Card rows for --grid virtual, one JSON array per ingredient in page order
+def generate_card_data(ingredients, options):
+    if options.grid != 'virtual':
+        return
+    yield "\n        const cardRows = ["
+    sep = ''
+    for ing in ingredients:
+        yield sep + json.dumps(card_row(ing), separators=(',', ':'), ensure_ascii=False)
+        sep = ','
+    yield f"];\n        const categoryClasses = {json.dumps(category_classes)};"
+
+# Sort select over SORT_FIELDS and the minimum rating select
+def generate_sort_controls():
+    sort_options = ''.join(f'<option value="{field}">{label}</option>' for field, label in SORT_FIELDS.items())
+    rating_options = ''.join(f'<option value="{rating}">{rating}+/10</option>' for rating in RATING_THRESHOLDS)
+    return f'''<div class="filter-controls">
+                    <div>
+                        <label class="filter-label" for="sortSelect">Sort by</label>
+                        <select class="filter-select" id="sortSelect" onchange="sortIngredients(this.value)">
+                            <option value="page">Dataset order</option>{sort_options}
+                        </select>
+                    </div>
+                    <div>
+                        <label class="filter-label" for="ratingSelect">Minimum rating</label>
+                        <select class="filter-select" id="ratingSelect" onchange="filterRating(Number(this.value))">
+                            <option value="0">Any</option>{rating_options}
+                        </select>
+                    </div>
+                </div>'''
+
+def render_facet_count(count):
+    return f' <span class="facet-count">{count}</span>'
+
+# Generate category filter buttons, with each category's ingredient count
+def generate_category_filters(categories, counts):
     return ''.join([
-        f'<button class="filter-btn" data-category="{escape(cat)}" onclick="filterCategory(\'{escape(cat)}\')">{escape(cat)}</button>'
+        f'<button class="filter-btn" data-category="{escape(cat)}" onclick="filterCategory(\'{escape(cat)}\')">{escape(cat)}{render_facet_count(counts[cat])}</button>'
         for cat in categories
     ])
 
-# Generate product filter buttons
-def generate_product_filters():
+# Generate product filter buttons, with each product's ingredient count
+def generate_product_filters(products, counts):
     return ''.join([
-        f'<button class="filter-btn product" data-product="{escape(prod)}" onclick="filterProduct(\'{escape(prod)}\')">{escape(prod)}</button>'
+        f'<button class="filter-btn product" data-product="{escape(prod)}" onclick="filterProduct(\'{escape(prod)}\')">{escape(prod)}{render_facet_count(counts[prod])}</button>'
         for prod in products
     ])
 
-# Generate the complete HTML
-html_content = f'''<!DOCTYPE html>
-<html lang="en">
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>Supplement Ingredients Research Database - AI-Assisted Meta-Analysis</title>
-    <link rel="preconnect" href="https://fonts.googleapis.com">
-    <link rel="preconnect" href="https://fonts.gstatic.com" crossorigin>
-    <link href="https://fonts.googleapis.com/css2?family=IBM+Plex+Sans:wght@300;400;500;600;700&family=IBM+Plex+Mono:wght@400;500&display=swap" rel="stylesheet">
-    <style>
-        * {{
+# Static stylesheet inlined into the page <style> block
+STYLESHEET = """        * {
             margin: 0;
             padding: 0;
             box-sizing: border-box;
-        }}
+        }
         
-        :root {{
+        :root {
             --bg-primary: #ffffff;
             --bg-secondary: #fafafa;
             --bg-tertiary: #f5f5f5;
@@ -238,59 +1330,59 @@ html_content = f'''<!DOCTYPE html>
             --border-medium: #d4d4d4;
             --border-dark: #a3a3a3;
             --accent: #171717;
-        }}
+        }
         
-        body {{
+        body {
             font-family: 'IBM Plex Sans', -apple-system, BlinkMacSystemFont, sans-serif;
             background: var(--bg-secondary);
             min-height: 100vh;
             color: var(--text-primary);
             line-height: 1.6;
             font-weight: 400;
-        }}
+        }
         
-        .container {{
+        .container {
             max-width: 1400px;
             margin: 0 auto;
             padding: 60px 40px;
-        }}
+        }
         
-        header {{
+        header {
             margin-bottom: 60px;
             padding-bottom: 40px;
             border-bottom: 1px solid var(--border-light);
-        }}
+        }
         
-        header h1 {{
+        header h1 {
             font-size: 2.5rem;
             font-weight: 300;
             letter-spacing: -0.02em;
             margin-bottom: 12px;
             color: var(--text-primary);
-        }}
+        }
         
-        header p {{
+        header p {
             font-size: 1.1rem;
             color: var(--text-secondary);
             max-width: 700px;
             font-weight: 400;
             line-height: 1.5;
-        }}
+        }
         
-        .meta-info {{
+        .meta-info {
             display: flex;
             gap: 24px;
             margin-top: 24px;
             font-family: 'IBM Plex Mono', monospace;
             font-size: 0.8rem;
             color: var(--text-tertiary);
-        }}
+        }
         
-        .meta-badge {{
+        .meta-badge {
             padding: 6px 0;
-        }}
+        }
         
-        .disclaimer {{
+        .disclaimer {
             background: var(--bg-primary);
             padding: 24px 28px;
             margin-bottom: 40px;
@@ -298,24 +1390,24 @@ html_content = f'''<!DOCTYPE html>
             color: var(--text-secondary);
             border: 1px solid var(--border-light);
             border-left: 3px solid var(--text-primary);
-        }}
+        }
         
-        .filters {{
+        .filters {
             background: var(--bg-primary);
             padding: 32px;
             margin-bottom: 40px;
             border: 1px solid var(--border-light);
-        }}
+        }
         
-        .filter-section {{
+        .filter-section {
             margin-bottom: 28px;
-        }}
+        }
         
-        .filter-section:last-child {{
+        .filter-section:last-child {
             margin-bottom: 0;
-        }}
+        }
         
-        .filter-label {{
+        .filter-label {
             font-family: 'IBM Plex Mono', monospace;
             font-weight: 500;
             color: var(--text-tertiary);
@@ -324,9 +1416,9 @@ html_content = f'''<!DOCTYPE html>
             font-size: 0.75rem;
             text-transform: uppercase;
             letter-spacing: 0.1em;
-        }}
+        }
         
-        .search-box {{
+        .search-box {
             width: 100%;
             padding: 14px 18px;
             border: 1px solid var(--border-medium);
@@ -335,25 +1427,25 @@ html_content = f'''<!DOCTYPE html>
             transition: all 0.2s ease;
             background: var(--bg-primary);
             color: var(--text-primary);
-        }}
+        }
         
-        .search-box:focus {{
+        .search-box:focus {
             outline: none;
             border-color: var(--text-primary);
             box-shadow: 0 0 0 1px var(--text-primary);
-        }}
+        }
         
-        .search-box::placeholder {{
+        .search-box::placeholder {
             color: var(--text-tertiary);
-        }}
+        }
         
-        .filter-buttons {{
+        .filter-buttons {
             display: flex;
             flex-wrap: wrap;
             gap: 8px;
-        }}
+        }
         
-        .filter-btn {{
+        .filter-btn {
             padding: 8px 16px;
             border: 1px solid var(--border-medium);
             background: var(--bg-primary);
@@ -363,52 +1455,91 @@ html_content = f'''<!DOCTYPE html>
             font-weight: 500;
             transition: all 0.15s ease;
             color: var(--text-secondary);
-        }}
+        }
         
-        .filter-btn:hover {{
+        .filter-btn:hover {
             border-color: var(--text-primary);
             color: var(--text-primary);
-        }}
+        }
         
-        .filter-btn.active {{
+        .filter-btn.active {
             background: var(--text-primary);
             color: var(--bg-primary);
             border-color: var(--text-primary);
-        }}
+        }
         
-        .filter-btn.product {{
+        .filter-btn.product {
             font-size: 0.8rem;
-        }}
+        }
+        
+        .facet-count {
+            font-family: 'IBM Plex Mono', monospace;
+            font-size: 0.75em;
+            opacity: 0.6;
+        }
         
-        .cards-grid {{
+        .filter-controls {
+            display: flex;
+            flex-wrap: wrap;
+            gap: 24px;
+        }
+        
+        .filter-select {
+            padding: 8px 12px;
+            border: 1px solid var(--border-medium);
+            background: var(--bg-primary);
+            color: var(--text-primary);
+            font-size: 0.85rem;
+            font-family: 'IBM Plex Sans', sans-serif;
+        }
+        
+        .filter-select:focus {
+            outline: none;
+            border-color: var(--text-primary);
+        }
+        
+        .cards-grid {
             display: grid;
             grid-template-columns: repeat(auto-fill, minmax(340px, 1fr));
             gap: 20px;
-        }}
+        }
         
-        .ingredient-card {{
+        .ingredient-card {
             background: var(--bg-primary);
             border: 1px solid var(--border-light);
             overflow: hidden;
             cursor: pointer;
             transition: all 0.2s ease;
-        }}
+        }
         
-        .ingredient-card:hover {{
+        .ingredient-card:hover {
             border-color: var(--border-dark);
             box-shadow: 0 4px 20px rgba(0, 0, 0, 0.08);
-        }}
+        }
         
-        .ingredient-card.hidden {{
+        .ingredient-card.hidden {
             display: none;
-        }}
+        }
         
-        .card-header {{
+        .cards-grid.virtual {
+            display: block;
+            position: relative;
+        }
+        
+        .cards-grid.virtual .ingredient-card {
+            position: absolute;
+            top: 0;
+            left: 0;
+            height: var(--card-height);
+            transition: border-color 0.2s ease, box-shadow 0.2s ease;
+        }
+        
+        .card-header {
             padding: 24px 24px 16px;
             border-bottom: 1px solid var(--border-light);
-        }}
+        }
         
-        .category-badge {{
+        .category-badge {
             display: inline-block;
             padding: 4px 10px;
             font-size: 0.7rem;
@@ -418,91 +1549,91 @@ html_content = f'''<!DOCTYPE html>
             letter-spacing: 0.05em;
             margin-bottom: 12px;
             border: 1px solid;
-        }}
+        }
         
-        .card-title {{
+        .card-title {
             font-size: 1.25rem;
             color: var(--text-primary);
             margin-bottom: 4px;
             font-weight: 600;
             letter-spacing: -0.01em;
-        }}
+        }
         
-        .card-dosage {{
+        .card-dosage {
             font-size: 0.85rem;
             color: var(--text-tertiary);
             font-weight: 400;
             font-family: 'IBM Plex Mono', monospace;
-        }}
+        }
         
-        .card-body {{
+        .card-body {
             padding: 20px 24px 24px;
-        }}
+        }
         
-        .card-description {{
+        .card-description {
             color: var(--text-secondary);
             font-size: 0.9rem;
             margin-bottom: 16px;
             line-height: 1.5;
-        }}
+        }
         
-        .card-rating {{
+        .card-rating {
             display: flex;
             align-items: center;
             gap: 8px;
             margin-bottom: 16px;
-        }}
+        }
         
-        .stars {{
+        .stars {
             color: var(--text-primary);
             font-size: 0.95rem;
             letter-spacing: 2px;
-        }}
+        }
         
-        .rating-value {{
+        .rating-value {
             color: var(--text-tertiary);
             font-size: 0.85rem;
             font-weight: 500;
             font-family: 'IBM Plex Mono', monospace;
-        }}
+        }
         
-        .key-benefits, .product-tags {{
+        .key-benefits, .product-tags {
             display: flex;
             flex-wrap: wrap;
             gap: 6px;
             margin-top: 12px;
-        }}
+        }
         
-        .benefit-tag {{
+        .benefit-tag {
             background: var(--bg-tertiary);
             color: var(--text-secondary);
             padding: 4px 10px;
             font-size: 0.75rem;
             font-weight: 500;
             border: 1px solid var(--border-light);
-        }}
+        }
         
-        .benefit-tag.large {{
+        .benefit-tag.large {
             padding: 6px 12px;
             font-size: 0.85rem;
-        }}
+        }
         
-        .product-tag {{
+        .product-tag {
             background: var(--bg-secondary);
             color: var(--text-secondary);
             padding: 4px 10px;
             font-size: 0.75rem;
             font-weight: 500;
             border: 1px solid var(--border-light);
-        }}
+        }
         
-        .product-tag.large {{
+        .product-tag.large {
             padding: 6px 12px;
             font-size: 0.85rem;
-        }}
+        }
         
         /* Modal Styles */
-        .modal {{
+        .modal {
             display: none;
             position: fixed;
             z-index: 1000;
@@ -512,21 +1643,21 @@ html_content = f'''<!DOCTYPE html>
             height: 100%;
             background-color: rgba(0, 0, 0, 0.5);
             animation: fadeIn 0.2s ease;
-        }}
+        }
         
-        .modal.active {{
+        .modal.active {
             display: flex;
             align-items: center;
             justify-content: center;
             padding: 40px;
-        }}
+        }
         
-        @keyframes fadeIn {{
-            from {{ opacity: 0; }}
-            to {{ opacity: 1; }}
-        }}
+        @keyframes fadeIn {
+            from { opacity: 0; }
+            to { opacity: 1; }
+        }
         
-        .modal-content {{
+        .modal-content {
             background: var(--bg-primary);
             max-width: 800px;
             width: 100%;
@@ -535,26 +1666,26 @@ html_content = f'''<!DOCTYPE html>
             animation: slideUp 0.2s ease;
             box-shadow: 0 25px 80px rgba(0, 0, 0, 0.3);
             border: 1px solid var(--border-medium);
-        }}
+        }
         
-        @keyframes slideUp {{
-            from {{ 
+        @keyframes slideUp {
+            from { 
                 opacity: 0;
                 transform: translateY(20px);
-            }}
-            to {{ 
+            }
+            to { 
                 opacity: 1;
                 transform: translateY(0);
-            }}
-        }}
+            }
+        }
         
-        .modal-header {{
+        .modal-header {
             padding: 32px;
             position: relative;
             border-bottom: 1px solid var(--border-light);
-        }}
+        }
         
-        .close-btn {{
+        .close-btn {
             position: absolute;
             top: 20px;
             right: 20px;
@@ -569,47 +1700,47 @@ html_content = f'''<!DOCTYPE html>
             justify-content: center;
             transition: all 0.15s ease;
             color: var(--text-tertiary);
-        }}
+        }
         
-        .close-btn:hover {{
+        .close-btn:hover {
             color: var(--text-primary);
-        }}
+        }
         
-        .modal-header h2 {{
+        .modal-header h2 {
             font-size: 1.6rem;
             color: var(--text-primary);
             margin: 12px 0 4px 0;
             font-weight: 600;
             letter-spacing: -0.01em;
-        }}
+        }
         
-        .molecular-formula {{
+        .molecular-formula {
             font-family: 'IBM Plex Mono', monospace;
             color: var(--text-tertiary);
             font-size: 0.85rem;
-        }}
+        }
         
-        .modal-dosage {{
+        .modal-dosage {
             margin-top: 8px;
             color: var(--text-secondary);
             font-weight: 400;
             font-family: 'IBM Plex Mono', monospace;
             font-size: 0.9rem;
-        }}
+        }
         
-        .modal-body {{
+        .modal-body {
             padding: 32px;
-        }}
+        }
         
-        .info-section {{
+        .info-section {
             margin-bottom: 32px;
-        }}
+        }
         
-        .info-section:last-child {{
+        .info-section:last-child {
             margin-bottom: 0;
-        }}
+        }
         
-        .info-section h3 {{
+        .info-section h3 {
             font-family: 'IBM Plex Mono', monospace;
             font-size: 0.8rem;
             color: var(--text-tertiary);
@@ -619,75 +1750,75 @@ html_content = f'''<!DOCTYPE html>
             text-transform: uppercase;
             letter-spacing: 0.05em;
             font-weight: 500;
-        }}
+        }
         
-        .info-section p {{
+        .info-section p {
             color: var(--text-secondary);
             line-height: 1.6;
-        }}
+        }
         
-        .benefits-list, .products-list {{
+        .benefits-list, .products-list {
             display: flex;
             flex-wrap: wrap;
             gap: 8px;
-        }}
+        }
         
-        .evidence-list {{
+        .evidence-list {
             display: flex;
             flex-direction: column;
             gap: 16px;
-        }}
+        }
         
-        .evidence-item {{
+        .evidence-item {
             background: var(--bg-secondary);
             padding: 20px;
             border: 1px solid var(--border-light);
             border-left: 2px solid var(--text-primary);
-        }}
+        }
         
-        .evidence-header {{
+        .evidence-header {
             display: flex;
             justify-content: space-between;
             align-items: flex-start;
             flex-wrap: wrap;
             gap: 12px;
             margin-bottom: 12px;
-        }}
+        }
         
-        .evidence-header h4 {{
+        .evidence-header h4 {
             font-size: 1rem;
             color: var(--text-primary);
             flex: 1;
             font-weight: 600;
-        }}
+        }
         
-        .evidence-metrics {{
+        .evidence-metrics {
             display: flex;
             gap: 8px;
             flex-wrap: wrap;
-        }}
+        }
         
-        .rating-badge, .impact-badge, .confidence-badge {{
+        .rating-badge, .impact-badge, .confidence-badge {
             padding: 4px 10px;
             font-size: 0.75rem;
             font-weight: 500;
             font-family: 'IBM Plex Mono', monospace;
             border: 1px solid var(--border-medium);
             background: var(--bg-primary);
-        }}
+        }
         
-        .rating-badge {{
+        .rating-badge {
             color: var(--text-primary);
-        }}
+        }
         
-        .evidence-description {{
+        .evidence-description {
             color: var(--text-secondary);
             margin-bottom: 12px;
             line-height: 1.5;
             font-size: 0.9rem;
-        }}
+        }
         
-        .evidence-footer {{
+        .evidence-footer {
             display: flex;
             justify-content: space-between;
             align-items: center;
@@ -698,107 +1829,189 @@ html_content = f'''<!DOCTYPE html>
             padding-top: 12px;
             border-top: 1px solid var(--border-light);
             font-family: 'IBM Plex Mono', monospace;
-        }}
+        }
         
-        .dosage-info strong {{
+        .dosage-info strong {
             color: var(--text-primary);
-        }}
+        }
         
-        .ref-link {{
+        .ref-link {
             color: var(--text-primary);
             text-decoration: underline;
-        }}
+        }
         
-        .ref-link:hover {{
+        .ref-link:hover {
             opacity: 0.7;
-        }}
+        }
         
-        .safety-section {{
+        .safety-section {
             background: var(--bg-secondary);
             padding: 20px;
             border: 1px solid var(--border-light);
-        }}
+        }
         
-        .safety-section h3 {{
+        .safety-section h3 {
             color: var(--text-primary);
             border-bottom-color: var(--border-medium);
-        }}
+        }
         
-        .safety-grid {{
+        .safety-grid {
             display: grid;
             grid-template-columns: repeat(auto-fit, minmax(250px, 1fr));
             gap: 15px;
-        }}
+        }
         
-        .safety-item {{
+        .safety-item {
             display: flex;
             flex-direction: column;
             gap: 4px;
-        }}
+        }
         
-        .safety-label {{
+        .safety-label {
             font-size: 0.75rem;
             color: var(--text-tertiary);
             font-weight: 500;
             text-transform: uppercase;
             letter-spacing: 0.05em;
             font-family: 'IBM Plex Mono', monospace;
-        }}
+        }
         
-        .safety-value {{
+        .safety-value {
             color: var(--text-secondary);
             font-size: 0.95rem;
-        }}
+        }
         
-        .safety-value.highlight {{
+        .safety-value.highlight {
             color: var(--text-primary);
             font-weight: 600;
-        }}
+        }
         
-        @media (max-width: 768px) {{
-            .container {{
+        @media (max-width: 768px) {
+            .container {
                 padding: 30px 20px;
-            }}
+            }
             
-            header h1 {{
+            header h1 {
                 font-size: 1.8rem;
-            }}
+            }
             
-            header p {{
+            header p {
                 font-size: 1rem;
-            }}
+            }
             
-            .meta-info {{
+            .meta-info {
                 gap: 16px;
-            }}
+            }
             
-            .cards-grid {{
+            .cards-grid {
                 grid-template-columns: 1fr;
-            }}
+            }
             
-            .modal-content {{
+            .modal-content {
                 max-height: 95vh;
                 border-radius: 0;
-            }}
+            }
             
-            .modal-header, .modal-body {{
+            .modal-header, .modal-body {
                 padding: 24px;
-            }}
+            }
             
-            .modal.active {{
+            .modal.active {
                 padding: 0;
-            }}
+            }
             
-            .evidence-header {{
+            .evidence-header {
                 flex-direction: column;
-            }}
+            }
             
-            .filter-btn {{
+            .filter-btn {
                 font-size: 0.8rem;
                 padding: 6px 12px;
-            }}
-        }}
-    </style>
+            }
+        }
+"""
+
+# One rule per color table entry, matching the classes render_card() and
+# render_modal() put on cards, modals and evidence badges
+def render_color_styles():
+    rules = []
+    for cat, colors in category_colors.items():
+        cls = category_classes[cat]
+        rules.append(f'''        .{cls} .card-header, .{cls} .modal-header {{
+            background: linear-gradient(135deg, {colors['bg']}, white);
+        }}
+        
+        .{cls} .category-badge {{
+            background-color: {colors['bg']};
+            color: {colors['text']};
+            border: 1px solid {colors['border']};
+        }}
+        
+''')
+    levels = [(impact_classes[level], color) for level, color in impact_colors.items()]
+    levels += [(confidence_classes[level], color) for level, color in confidence_colors.items()]
+    levels.append(('confidence-unknown', UNKNOWN_CONFIDENCE_COLOR))
+    for cls, color in levels:
+        rules.append(f'''        .{cls} {{
+            border-color: {color};
+            color: {color};
+        }}
+        
+''')
+    return ''.join(rules)
+
+# Inline <style> block, or with --split-assets a link to the hashed stylesheet
+def render_styles(stylesheet, assets=None):
+    if assets is None:
+        return f'<style>\n{stylesheet}    </style>'
+    return f'<link rel="stylesheet" href="{escape(assets.write("style", ".css", [stylesheet]))}">'
+
+# Inline <script> holding the page data and behaviour, or with --split-assets
+# one hashed script for each, so a data change leaves the behaviour cached
+def render_scripts(data_chunks, script_chunks, assets=None):
+    if assets is None:
+        yield '    <script>'
+        yield from data_chunks
+        yield from script_chunks
+        yield '\n    </script>'
+        return
+    data_src = assets.write('data', '.js', data_chunks)
+    script_src = assets.write('app', '.js', script_chunks)
+    yield f'    <script src="{escape(data_src)}"></script>\n'
+    yield f'    <script src="{escape(script_src)}"></script>'
+
+GOOGLE_FONT_LINKS = '''<link rel="preconnect" href="https://fonts.googleapis.com">
+    <link rel="preconnect" href="https://fonts.gstatic.com" crossorigin>
+    <link href="https://fonts.googleapis.com/css2?family=IBM+Plex+Sans:wght@300;400;500;600;700&family=IBM+Plex+Mono:wght@400;500&display=swap" rel="stylesheet">'''
+
+# Preload links and @font-face rules for the faces written by with_fonts(),
+# or the Google Fonts stylesheet when the site was built without --fonts
+def render_font_links(faces):
+    if not faces:
+        return GOOGLE_FONT_LINKS
+    links = [
+        f'<link rel="preload" href="{escape(face["url"])}" as="font" '
+        f'type="{FONT_MIME_TYPES[face["format"]]}" crossorigin>'
+        for face in faces
+    ]
+    rules = [
+        f"        @font-face {{ font-family: '{face['family']}'; font-style: normal; "
+        f"font-weight: {face['weight']}; font-display: swap; "
+        f"src: url('{face['url']}') format('{face['format']}'); }}"
+        for face in faces
+    ]
+    return '\n    '.join(links) + '\n    <style>\n' + '\n'.join(rules) + '\n    </style>'
+
+# Document head, page header and disclaimer shared by every page of the site
+def render_page_header(data, stylesheet=STYLESHEET, assets=None):
+    return f'''<!DOCTYPE html>
+<html lang="en">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>Supplement Ingredients Research Database - AI-Assisted Meta-Analysis</title>
+    {render_font_links(data.get('fontFaces'))}
+    {render_styles(stylesheet, assets)}
 </head>
 <body>
     <div class="container">
@@ -816,7 +2029,104 @@ html_content = f'''<!DOCTYPE html>
             <strong>Disclaimer:</strong> {escape(data['disclaimer'])}
         </div>
         
-        <div class="filters">
+'''
+
+# Build stages in report order; the page template between them is not timed
+PROFILE_STAGES = ['load', 'validate', 'prepare', 'filters', 'cards', 'modals', 'embed', 'write']
+
+# Wall time, peak traced allocation and output bytes of each build stage for
+# --profile. Stages interleave while the page streams out, so every chunk a
+# stage produces is measured separately and the totals accumulated
+class BuildProfile:
+    def __init__(self):
+        self.stages = {name: {'seconds': 0.0, 'peak_bytes': 0, 'output_bytes': 0}
+                       for name in PROFILE_STAGES}
+
+    def start(self):
+        tracemalloc.start()
+
+    def stop(self):
+        tracemalloc.stop()
+
+    @contextmanager
+    def measure(self, name):
+        stage = self.stages.setdefault(name, {'seconds': 0.0, 'peak_bytes': 0, 'output_bytes': 0})
+        tracing = tracemalloc.is_tracing()
+        if tracing:
+            baseline = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            stage['seconds'] += time.perf_counter() - started
+            if tracing:
+                peak = tracemalloc.get_traced_memory()[1] - baseline
+                stage['peak_bytes'] = max(stage['peak_bytes'], peak)
+
+    def add_output(self, name, size):
+        self.stages[name]['output_bytes'] += size
+
+    # fn(*args) measured as stage name; string results count as its output
+    def call(self, name, fn, *args):
+        with self.measure(name):
+            result = fn(*args)
+        if isinstance(result, str):
+            self.add_output(name, len(result.encode('utf-8')))
+        return result
+
+    # Pass chunks through, measuring the work of producing each one as stage name
+    def chunks(self, name, chunks):
+        chunks = iter(chunks)
+        while True:
+            with self.measure(name):
+                chunk = next(chunks, None)
+            if chunk is None:
+                return
+            self.add_output(name, len(chunk.encode('utf-8')))
+            yield chunk
+
+    def report(self):
+        lines = [f"{'Stage':<10}{'Time (ms)':>12}{'Peak alloc (KB)':>18}{'Output (KB)':>14}"]
+        for name, stage in self.stages.items():
+            output = f"{stage['output_bytes'] / 1024:.1f}" if name not in ('load', 'validate', 'prepare') else '-'
+            lines.append(f"{name:<10}{stage['seconds'] * 1000:>12.1f}"
+                         f"{stage['peak_bytes'] / 1024:>18.1f}{output:>14}")
+        total = sum(stage['seconds'] for stage in self.stages.values())
+        lines.append(f"{'total':<10}{total * 1000:>12.1f}")
+        return '\n'.join(lines)
+
+# Stand-in for BuildProfile when --profile is off: measures nothing
+class NullProfile:
+    def measure(self, name):
+        return nullcontext()
+
+    def add_output(self, name, size):
+        pass
+
+    def call(self, name, fn, *args):
+        return fn(*args)
+
+    def chunks(self, name, chunks):
+        return chunks
+
+NULL_PROFILE = NullProfile()
+
+# Yield the complete HTML page in chunks, so it can be written without
+# holding the whole page in memory
+def iter_page(data, options, cache=None, pool=None, nav='', profile=NULL_PROFILE, assets=None):
+    ingredients = data['ingredients']
+    facets = profile.call('filters', build_facets, ingredients, data['categories'], data['products'])
+    counts = {kind: {key: len(positions) for key, positions in facet.items()} for kind, facet in facets.items()}
+    category_filters = profile.call('filters', generate_category_filters, data['categories'], counts['categories'])
+    product_filters = profile.call('filters', generate_product_filters, data['products'], counts['products'])
+    total = render_facet_count(len(ingredients))
+    stylesheet = STYLESHEET + render_color_styles() + (SHARD_STYLESHEET if nav else '')
+    if options.minify:
+        stylesheet = minify_css(stylesheet)
+    yield render_page_header(data, stylesheet, assets)
+    yield nav
+    yield f'''        <div class="filters">
             <div class="filter-section">
                 <label class="filter-label">Search</label>
                 <input type="text" class="search-box" id="searchBox" placeholder="Search by name, category, or benefit..." oninput="searchIngredients()">
@@ -825,32 +2135,395 @@ html_content = f'''<!DOCTYPE html>
             <div class="filter-section">
                 <label class="filter-label">Category</label>
                 <div class="filter-buttons">
-                    <button class="filter-btn active" data-category="all" onclick="filterCategory('all')">All</button>
-                    {generate_category_filters()}
+                    <button class="filter-btn active" data-category="all" onclick="filterCategory('all')">All{total}</button>
+                    {category_filters}
                 </div>
             </div>
             
             <div class="filter-section">
                 <label class="filter-label">Product</label>
                 <div class="filter-buttons">
-                    <button class="filter-btn active" data-product="all" onclick="filterProduct('all')">All Products</button>
-                    {generate_product_filters()}
+                    <button class="filter-btn active" data-product="all" onclick="filterProduct('all')">All Products{total}</button>
+                    {product_filters}
                 </div>
             </div>
+            
+            <div class="filter-section">
+                {generate_sort_controls()}
+            </div>
         </div>
         
         <div class="cards-grid" id="cardsGrid">
-            {generate_cards()}
+            '''
+    if options.grid == 'virtual':
+        ingredients_shown = itertools.islice(ingredients, VIRTUAL_INITIAL_CARDS)
+    else:
+        ingredients_shown = ingredients
+    yield from profile.chunks('cards', generate_cards(ingredients_shown, cache, pool))
+    yield f'''
         </div>
         
-        {generate_modals()}
+        '''
+    if options.modals == 'eager':
+        yield from profile.chunks('modals', generate_modals(ingredients, cache, pool))
+    yield f'''
     </div>
     
-    <script>
+'''
+    data_chunks = profile.chunks('embed', generate_page_data(ingredients, options, facets))
+    script_chunks = generate_page_script(options)
+    if options.minify:
+        data_chunks = map(minify_js, data_chunks)
+        script_chunks = map(minify_js, script_chunks)
+    yield from render_scripts(data_chunks, script_chunks, assets)
+    yield '''
+</body>
+</html>
+'''
+
+# Data the page script reads: the facet and search indexes and, with lazy
+# modals, the records modals are built from
+def generate_page_data(ingredients, options, facets):
+    facet_index = generate_facet_index(facets)
+    search_index = generate_search_index(ingredients)
+    stats_index = generate_stats_index(ingredients)
+    yield f'''
+        // Positions of the ingredients in each category and product
+        const facetIndex = {facet_index};
+        // Inverted index: sorted tokens with parallel posting lists of positions in ids
+        const searchIndex = {search_index};
+        // Positions ranked by each sortable statistic, and mean ratings for the rating filter
+        const statsIndex = {stats_index};'''
+    yield from generate_modal_data(ingredients, options)
+    yield from generate_card_data(ingredients, options)
+
+MAIN_SEARCH_SCRIPT = """
+        function applyFilters() {
+            const bits = allBits();
+            if (currentCategory !== 'all') andBits(bits, categoryBits[currentCategory]);
+            if (currentProduct !== 'all') andBits(bits, productBits[currentProduct]);
+            if (currentMinRating > 0) andBits(bits, ratingBits(currentMinRating));
+            if (currentMatches !== null) andBits(bits, currentMatches);
+            showBits(bits);
+        }
+"""
+
+# Only cards whose visibility changes are touched
+SHOW_BITS_SCRIPT = """
+        function showBits(bits) {
+            if (virtualGrid !== null) {
+                virtualGrid.show(bits, currentOrder);
+            } else {
+                for (let w = 0; w < wordCount; w++) {
+                    for (let changed = visibleBits[w] ^ bits[w]; changed !== 0; changed &= changed - 1) {
+                        const bit = changed & -changed;
+                        const pos = (w << 5) + 31 - Math.clz32(bit);
+                        ingredientCards[pos].classList.toggle('hidden', (bits[w] & bit) === 0);
+                    }
+                }
+            }
+            visibleBits = bits;
+        }
+        
+"""
+
+# Keystrokes closer together than this many milliseconds send one query to
+# the --search worker
+SEARCH_DEBOUNCE_MS = 120
+
+# Facet bitsets for --search worker, built on first use by whichever thread
+# runs the matching
+WORKER_FACET_SCRIPT = """
+        let categoryBits = null;
+        let productBits = null;
+        
+        function buildFacetBits() {
+            categoryBits = {};
+            productBits = {};
+            for (const [category, positions] of Object.entries(facetIndex.categories)) {
+                categoryBits[category] = addPositions(emptyBits(), positions);
+            }
+            for (const [product, positions] of Object.entries(facetIndex.products)) {
+                productBits[product] = addPositions(emptyBits(), positions);
+            }
+        }
+        
         let currentCategory = 'all';
         let currentProduct = 'all';
-        let currentSearch = '';
+        let currentMinRating = 0;
+        let currentOrder = null;
+        let visibleBits = allBits();
+        
+"""
+
+# Filtering for --search worker: a worker built from the page's own matching
+# functions holds a copy of the indexes and answers each request with the
+# bitset of visible positions. Requests are numbered; the worker skips one
+# replaced before it started and the page drops replies to superseded ones.
+# Where no worker can be created the same functions run on the main thread
+WORKER_SEARCH_SCRIPT = """
+        function filterBits(category, product, minRating, query) {
+            if (categoryBits === null) buildFacetBits();
+            const bits = allBits();
+            if (category !== 'all') andBits(bits, categoryBits[category]);
+            if (product !== 'all') andBits(bits, productBits[product]);
+            if (minRating > 0) andBits(bits, ratingBits(minRating));
+            const matches = matchQuery(query);
+            if (matches !== null) andBits(bits, matches);
+            return bits;
+        }
+        
+        // Runs inside the worker
+        function matchWorkerMain() {
+            let pending = null;
+            self.onmessage = event => {
+                if (event.data.searchIndex) {
+                    ({searchIndex, facetIndex, statsIndex} = event.data);
+                    ingredientCount = searchIndex.ids.length;
+                    wordCount = (ingredientCount + 31) >>> 5;
+                    return;
+                }
+                const idle = pending === null;
+                pending = event.data;
+                if (!idle) return;
+                setTimeout(() => {
+                    const {seq, category, product, minRating, query} = pending;
+                    pending = null;
+                    const bits = filterBits(category, product, minRating, query);
+                    self.postMessage({seq, bits}, [bits.buffer]);
+                }, 0);
+            };
+        }
+        
+        function createMatchWorker() {
+            if (typeof Worker === 'undefined' || typeof Blob === 'undefined') return null;
+            const source = [
+                'let searchIndex, facetIndex, statsIndex, ingredientCount, wordCount;',
+                'let categoryBits = null, productBits = null;',
+                emptyBits, allBits, addPositions, andBits, buildFacetBits, lookupPrefix, matchQuery, ratingBits,
+                filterBits,
+                `(${matchWorkerMain})();`
+            ].join('\\n');
+            try {
+                const worker = new Worker(URL.createObjectURL(new Blob([source], {type: 'text/javascript'})));
+                worker.onmessage = event => {
+                    if (event.data.seq === filterSeq) showBits(event.data.bits);
+                };
+                // e.g. blocked by a Content-Security-Policy: match here instead
+                worker.onerror = () => {
+                    matchWorker = null;
+                    applyFilters();
+                };
+                worker.postMessage({searchIndex, facetIndex, statsIndex});
+                return worker;
+            } catch (e) {
+                return null;
+            }
+        }
+        
+        let matchWorker = createMatchWorker();
+        let filterSeq = 0;
+        
+        function applyFilters() {
+            const seq = ++filterSeq;
+            const query = document.getElementById('searchBox').value;
+            if (matchWorker !== null) {
+                matchWorker.postMessage({
+                    seq, category: currentCategory, product: currentProduct, minRating: currentMinRating, query
+                });
+            } else {
+                showBits(filterBits(currentCategory, currentProduct, currentMinRating, query));
+            }
+        }
+"""
+
+STATIC_GRID_SCRIPT = """
+        const virtualGrid = null;
+"""
+
+# Virtualized card grid for --grid virtual: a pool of absolutely positioned
+# cards covers the rows near the viewport. Position i of the filtered list is
+# always drawn by pool card i % pool.length, so scrolling by a row refills
+# only that row's cards
+VIRTUAL_GRID_SCRIPT = """
+        function cardMarkup(row) {
+            const [id, category, name, dosage, description, stars, rating, benefits, products] = row;
+            return `
+            <div class="card-header">
+                <span class="category-badge">${escapeHtml(category)}</span>
+                <h3 class="card-title">${escapeHtml(name)}</h3>
+                <p class="card-dosage">${escapeHtml(dosage)}</p>
+            </div>
+            <div class="card-body">
+                <p class="card-description">${escapeHtml(description)}...</p>
+                <div class="card-rating">
+                    <span class="stars">${'★'.repeat(stars)}${'☆'.repeat(Math.max(0, 5 - stars))}</span>
+                    <span class="rating-value">${rating}/10</span>
+                </div>
+                <div class="key-benefits">
+                    ${benefits.map(b => `<span class="benefit-tag">${escapeHtml(b)}</span>`).join('')}
+                </div>
+                <div class="product-tags">
+                    ${products.map(p => `<span class="product-tag">${escapeHtml(p)}</span>`).join('')}
+                </div>
+            </div>`;
+        }
+        
+        function bitPositions(bits) {
+            const positions = [];
+            for (let w = 0; w < wordCount; w++) {
+                for (let word = bits[w]; word !== 0; word &= word - 1) {
+                    positions.push((w << 5) + 31 - Math.clz32(word & -word));
+                }
+            }
+            return positions;
+        }
+        
+        function createVirtualGrid() {
+            const grid = document.getElementById('cardsGrid');
+            const gap = 20;
+            const minCardWidth = 340;
+            const overscanRows = 2;
+            // Every card gets the height of the tallest server-rendered row
+            const rendered = Array.from(grid.querySelectorAll('.ingredient-card'));
+            const cardHeight = Math.max(240, ...rendered.map(card => card.offsetHeight));
+            const rowStride = cardHeight + gap;
+            const pool = [];
+            let positions = Array.from({length: ingredientCount}, (_, i) => i);
+            let scheduled = false;
+            
+            grid.textContent = '';
+            grid.classList.add('virtual');
+            grid.style.setProperty('--card-height', cardHeight + 'px');
+            
+            function fill(card, index) {
+                const row = cardRows[positions[index]];
+                card.className = 'ingredient-card ' + (categoryClasses[row[1]] || categoryClasses['Other']);
+                card.dataset.category = row[1];
+                card.dataset.id = row[0];
+                card.dataset.index = index;
+                card.innerHTML = cardMarkup(row);
+            }
+            
+            function layout(refill) {
+                const width = grid.clientWidth;
+                const columns = Math.max(1, Math.floor((width + gap) / (minCardWidth + gap)));
+                const cardWidth = (width - gap * (columns - 1)) / columns;
+                const rows = Math.ceil(positions.length / columns);
+                grid.style.height = Math.max(0, rows * rowStride - gap) + 'px';
+                
+                const offset = Math.max(0, -grid.getBoundingClientRect().top);
+                const firstRow = Math.max(0, Math.floor(offset / rowStride) - overscanRows);
+                const lastRow = Math.min(rows, Math.ceil((offset + window.innerHeight) / rowStride) + overscanRows);
+                const first = firstRow * columns;
+                const last = Math.min(positions.length, lastRow * columns);
+                
+                const size = (Math.ceil(window.innerHeight / rowStride) + 1 + 2 * overscanRows) * columns;
+                if (size > pool.length) {
+                    while (pool.length < size) {
+                        const card = document.createElement('div');
+                        card.onclick = () => openModal(card.dataset.id);
+                        grid.appendChild(card);
+                        pool.push(card);
+                    }
+                    refill = true;
+                }
+                
+                for (let index = first; index < last; index++) {
+                    const card = pool[index % pool.length];
+                    if (refill || card.dataset.index !== String(index)) fill(card, index);
+                    const x = (index % columns) * (cardWidth + gap);
+                    const y = Math.floor(index / columns) * rowStride;
+                    card.style.width = cardWidth + 'px';
+                    card.style.transform = `translate(${x}px, ${y}px)`;
+                }
+                pool.forEach(card => {
+                    const index = card.dataset.index === undefined ? -1 : Number(card.dataset.index);
+                    card.classList.toggle('hidden', index < first || index >= last);
+                });
+            }
+            
+            function schedule() {
+                if (scheduled) return;
+                scheduled = true;
+                requestAnimationFrame(() => {
+                    scheduled = false;
+                    layout(false);
+                });
+            }
+            
+            window.addEventListener('scroll', schedule, {passive: true});
+            window.addEventListener('resize', schedule);
+            layout(true);
+            
+            return {
+                show(bits, order) {
+                    positions = order === null ? bitPositions(bits)
+                        : order.filter(pos => bits[pos >>> 5] & (1 << (pos & 31)));
+                    layout(true);
+                }
+            };
+        }
+        
+        const virtualGrid = createVirtualGrid();
+"""
+
+# Page behaviour: filtering, search and opening modals; identical for every
+# build with the same modal mode
+def generate_page_script(options):
+    yield f'''
+        const ingredientCards = Array.from(document.querySelectorAll('.ingredient-card'));
+        const ingredientCount = searchIndex.ids.length;
+        const wordCount = (ingredientCount + 31) >>> 5;
+        
+        // Sets of card positions as bitsets, so filters combine with a bitwise AND
+        function emptyBits() {{
+            return new Uint32Array(wordCount);
+        }}
+        
+        function allBits() {{
+            const bits = emptyBits().fill(0xffffffff);
+            if (ingredientCount & 31) bits[wordCount - 1] = (1 << (ingredientCount & 31)) - 1;
+            return bits;
+        }}
+        
+        function addPositions(bits, positions) {{
+            for (const pos of positions) bits[pos >>> 5] |= 1 << (pos & 31);
+            return bits;
+        }}
         
+        function andBits(bits, other) {{
+            for (let w = 0; w < wordCount; w++) bits[w] &= other[w];
+            return bits;
+        }}
+        
+        '''
+    if options.search == 'worker':
+        yield WORKER_FACET_SCRIPT
+    else:
+        yield f'''
+        const categoryBits = {{}};
+        const productBits = {{}};
+        for (const [category, positions] of Object.entries(facetIndex.categories)) {{
+            categoryBits[category] = addPositions(emptyBits(), positions);
+        }}
+        for (const [product, positions] of Object.entries(facetIndex.products)) {{
+            productBits[product] = addPositions(emptyBits(), positions);
+        }}
+        
+        let currentCategory = 'all';
+        let currentProduct = 'all';
+        let currentMinRating = 0;
+        let currentOrder = null;
+        let currentMatches = null;
+        let visibleBits = allBits();
+        
+        '''
+    if options.grid == 'virtual':
+        yield VIRTUAL_GRID_SCRIPT
+    else:
+        yield STATIC_GRID_SCRIPT
+    yield f'''
         function filterCategory(category) {{
             currentCategory = category;
             
@@ -879,54 +2552,98 @@ html_content = f'''<!DOCTYPE html>
             applyFilters();
         }}
         
+        function filterRating(minRating) {{
+            currentMinRating = minRating;
+            applyFilters();
+        }}
+        
+        // Reorder the cards by a ranking from statsIndex, or back to page order
+        function sortIngredients(field) {{
+            currentOrder = field === 'page' ? null : statsIndex.orders[field];
+            if (virtualGrid !== null) {{
+                virtualGrid.show(visibleBits, currentOrder);
+                return;
+            }}
+            const fragment = document.createDocumentFragment();
+            for (const pos of currentOrder || ingredientCards.keys()) fragment.appendChild(ingredientCards[pos]);
+            document.getElementById('cardsGrid').appendChild(fragment);
+        }}
+        
+        '''
+    if options.search == 'worker':
+        yield f'''
+        // Keystrokes less than {SEARCH_DEBOUNCE_MS} ms apart send a single query
+        let searchTimer = 0;
         function searchIngredients() {{
-            currentSearch = document.getElementById('searchBox').value.toLowerCase();
+            clearTimeout(searchTimer);
+            searchTimer = setTimeout(applyFilters, {SEARCH_DEBOUNCE_MS});
+        }}
+        '''
+    else:
+        yield '''
+        function searchIngredients() {
+            currentMatches = matchQuery(document.getElementById('searchBox').value);
             applyFilters();
+        }
+        '''
+    yield f'''
+        // Positions of every ingredient with a token starting with prefix
+        function lookupPrefix(prefix) {{
+            const tokens = searchIndex.tokens;
+            let lo = 0, hi = tokens.length;
+            while (lo < hi) {{
+                const mid = (lo + hi) >> 1;
+                if (tokens[mid] < prefix) lo = mid + 1; else hi = mid;
+            }}
+            const matches = emptyBits();
+            for (let i = lo; i < tokens.length && tokens[i].startsWith(prefix); i++) {{
+                addPositions(matches, searchIndex.postings[i]);
+            }}
+            return matches;
         }}
         
-        function applyFilters() {{
-            const cards = document.querySelectorAll('.ingredient-card');
-            
-            cards.forEach(card => {{
-                const category = card.dataset.category;
-                const id = card.dataset.id;
-                const ingredient = getIngredientById(id);
-                
-                let matchesCategory = currentCategory === 'all' || category === currentCategory;
-                let matchesProduct = currentProduct === 'all' || ingredient.products.includes(currentProduct);
-                let matchesSearch = true;
-                
-                if (currentSearch) {{
-                    const searchText = (
-                        ingredient.name + ' ' +
-                        ingredient.category + ' ' +
-                        ingredient.keyBenefits.join(' ') + ' ' +
-                        ingredient.description
-                    ).toLowerCase();
-                    matchesSearch = searchText.includes(currentSearch);
-                }}
-                
-                if (matchesCategory && matchesProduct && matchesSearch) {{
-                    card.classList.remove('hidden');
-                }} else {{
-                    card.classList.add('hidden');
-                }}
-            }});
+        // Bitset of matching positions, or null when the query has no terms
+        function matchQuery(query) {{
+            const terms = query.toLowerCase().match(/[\\p{{L}}\\p{{N}}]+/gu);
+            if (!terms) return null;
+            let result = null;
+            for (const term of terms) {{
+                const matches = lookupPrefix(term);
+                result = result === null ? matches : andBits(result, matches);
+            }}
+            return result;
         }}
         
-        function getIngredientById(id) {{
-            const ingredientsData = {json.dumps(ingredients)};
-            return ingredientsData.find(i => i.id === id);
+        // Positions rated at least minRating, found by binary search in the ranking by mean rating
+        function ratingBits(minRating) {{
+            const order = statsIndex.orders.meanRating;
+            let lo = 0, hi = order.length;
+            while (lo < hi) {{
+                const mid = (lo + hi) >> 1;
+                if (statsIndex.meanRating[order[mid]] >= minRating) lo = mid + 1; else hi = mid;
+            }}
+            return addPositions(emptyBits(), order.slice(0, lo));
         }}
         
+        '''
+    yield WORKER_SEARCH_SCRIPT if options.search == 'worker' else MAIN_SEARCH_SCRIPT
+    yield SHOW_BITS_SCRIPT
+    if options.modals == 'lazy' or options.grid == 'virtual':
+        yield ESCAPE_HTML_SCRIPT
+    if options.modals == 'eager':
+        yield EAGER_MODAL_SCRIPT
+    else:
+        yield COLUMNAR_RECORDS_SCRIPT if options.payload == 'columnar' else JSON_RECORDS_SCRIPT
+        yield LAZY_MODAL_SCRIPT
+    yield f'''
         function openModal(id) {{
-            const modal = document.getElementById('modal-' + id);
+            const modal = getModal(id);
             modal.classList.add('active');
             document.body.style.overflow = 'hidden';
         }}
         
         function closeModal(id) {{
-            const modal = document.getElementById('modal-' + id);
+            const modal = getModal(id);
             modal.classList.remove('active');
             document.body.style.overflow = '';
         }}
@@ -947,15 +2664,761 @@ html_content = f'''<!DOCTYPE html>
                 }});
                 document.body.style.overflow = '';
             }}
-        }});
-    </script>
+        }});'''
+
+# Extra styles for the section navigation of sharded sites
+SHARD_STYLESHEET = """        .shard-nav {
+            background: var(--bg-primary);
+            padding: 32px;
+            margin-bottom: 40px;
+            border: 1px solid var(--border-light);
+        }
+        
+        .shard-links {
+            display: flex;
+            flex-wrap: wrap;
+            gap: 8px;
+        }
+        
+        .shard-link {
+            padding: 8px 16px;
+            border: 1px solid var(--border-medium);
+            background: var(--bg-primary);
+            font-size: 0.85rem;
+            font-weight: 500;
+            color: var(--text-secondary);
+            text-decoration: none;
+            transition: all 0.15s ease;
+        }
+        
+        .shard-link:hover {
+            border-color: var(--text-primary);
+            color: var(--text-primary);
+        }
+        
+        .shard-link.active {
+            background: var(--text-primary);
+            color: var(--bg-primary);
+            border-color: var(--text-primary);
+        }
+        
+        .shard-count {
+            margin-left: 6px;
+            font-family: 'IBM Plex Mono', monospace;
+            font-size: 0.75rem;
+            opacity: 0.7;
+        }
+"""
+
+# Ingredients of one shard of streamed input: a re-iterable view that
+# filters the full ingredients on each pass instead of holding the shard
+class IngredientSubset:
+    def __init__(self, source, count, category=None, start=0, stop=None):
+        self.source = source
+        self.count = count
+        self.category = category
+        self.start = start
+        self.stop = stop
+
+    def __iter__(self):
+        for ing in itertools.islice(self.source, self.start, self.stop):
+            if self.category is None or ing['category'] == self.category:
+                yield ing
+
+    def __len__(self):
+        return self.count
+
+# Split the site into shards, one per category or per page_size ingredients;
+# a single pass collects each shard's size, categories and products, and
+# for loaded input the shard's own list of ingredients
+def plan_shards(data, options, out_path):
+    stem, ext = os.path.splitext(os.path.basename(out_path))
+    streamed = is_streamed(data['ingredients'])
+    groups = {}
+    for pos, ing in enumerate(data['ingredients']):
+        key = ing['category'] if options.shard == 'category' else pos // options.page_size
+        group = groups.setdefault(key, {'count': 0, 'categories': set(), 'products': set(), 'ingredients': []})
+        group['count'] += 1
+        group['categories'].add(ing['category'])
+        group['products'].update(ing['products'])
+        if not streamed:
+            group['ingredients'].append(ing)
+
+    if options.shard == 'category':
+        keys = [cat for cat in data['categories'] if cat in groups]
+        keys += [cat for cat in groups if cat not in data['categories']]
+    else:
+        keys = sorted(groups)
+
+    shards = []
+    for key in keys:
+        group = groups[key]
+        if options.shard == 'category':
+            title = key
+            file_name = f'{stem}-{slugify(key)}{ext}'
+        else:
+            start = key * options.page_size
+            title = f'{start + 1}–{start + group["count"]}'
+            file_name = f'{stem}-page-{key + 1}{ext}'
+        if not streamed:
+            ingredients = group['ingredients']
+        elif options.shard == 'category':
+            ingredients = IngredientSubset(data['ingredients'], group['count'], category=key)
+        else:
+            ingredients = IngredientSubset(data['ingredients'], group['count'],
+                                           start=start, stop=start + options.page_size)
+        shard_data = dict(data)
+        shard_data['ingredients'] = ingredients
+        shard_data['categories'] = [c for c in data['categories'] if c in group['categories']]
+        shard_data['products'] = [p for p in data['products'] if p in group['products']]
+        shards.append({'title': title, 'file': file_name, 'count': group['count'], 'data': shard_data})
+    return shards
+
+# Links between the index page and every shard
+def render_shard_nav(shards, index_file, current=None):
+    links = [f'<a class="shard-link{"" if current is not None else " active"}" href="{escape(index_file)}">All sections</a>']
+    for i, shard in enumerate(shards):
+        active = ' active' if i == current else ''
+        links.append(
+            f'<a class="shard-link{active}" href="{escape(shard["file"])}">'
+            f'{escape(shard["title"])}<span class="shard-count">{shard["count"]}</span></a>'
+        )
+    return f'''        <nav class="shard-nav">
+            <label class="filter-label">Sections</label>
+            <div class="shard-links">
+                {''.join(links)}
+            </div>
+        </nav>
+        
+'''
+
+# Index page of a sharded site: only the header and links to the shards
+def iter_index_page(data, shards, index_file, options, assets=None):
+    stylesheet = STYLESHEET + SHARD_STYLESHEET
+    if options.minify:
+        stylesheet = minify_css(stylesheet)
+    yield render_page_header(data, stylesheet, assets)
+    yield render_shard_nav(shards, index_file)
+    yield '''    </div>
 </body>
 </html>
 '''
 
-# Write the HTML file
-with open('ingredients.html', 'w') as f:
-    f.write(html_content)
+# Write the index page to out_path and each shard page next to it
+def write_shards(data, out_path, options, cache=None, pool=None, profile=NULL_PROFILE, assets=None):
+    shards = plan_shards(data, options, out_path)
+    index_file = os.path.basename(out_path)
+    out_dir = os.path.dirname(out_path)
+    written = [out_path]
+    write_page(iter_index_page(data, shards, index_file, options, assets), out_path, profile, options.minify)
+    for i, shard in enumerate(shards):
+        shard_path = os.path.join(out_dir, shard['file'])
+        nav = render_shard_nav(shards, index_file, current=i)
+        write_page(iter_page(shard['data'], options, cache, pool, nav, profile, assets), shard_path,
+                   profile, options.minify)
+        written.append(shard_path)
+    return written
+
+# Elements whose surrounding whitespace never renders, so the minifier may
+# drop it; whitespace next to any other tag is collapsed to one space
+BLOCK_TAGS = {
+    'html', 'head', 'body', 'meta', 'link', 'title', 'div', 'section', 'header',
+    'nav', 'main', 'footer', 'p', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'ul', 'ol', 'li'
+}
+
+# Elements whose content is copied verbatim by the HTML minifier
+RAW_TAGS = {'pre', 'textarea', 'script', 'style'}
+
+MARKUP_RE = re.compile(r'<!--.*?-->|<[^>]*>', re.S)
+TAG_NAME_RE = re.compile(r'</?([A-Za-z][A-Za-z0-9]*)')
+HTML_SPACE_RE = re.compile(r'[ \t\n\r\f]+')
+
+# Streaming HTML minifier for the chunks iter_page() yields: drops comments and
+# whitespace between block-level tags, and collapses other whitespace runs to
+# one space, which renders the same. Chunks must not split a tag
+class HtmlMinifier:
+    def __init__(self):
+        self.raw = None
+        self.space = False
+        self.after_block = True
+
+    def feed(self, chunk):
+        out = []
+        pos = 0
+        while pos < len(chunk):
+            if self.raw:
+                end = chunk.lower().find('</' + self.raw, pos)
+                if end < 0:
+                    out.append(chunk[pos:])
+                    break
+                out.append(chunk[pos:end])
+                pos = end
+                self.raw = None
+            match = MARKUP_RE.search(chunk, pos)
+            end = match.start() if match else len(chunk)
+            if end > pos:
+                self._text(chunk[pos:end], out)
+            if not match:
+                break
+            self._tag(match.group(), out)
+            pos = match.end()
+        return ''.join(out)
+
+    def _text(self, text, out):
+        words = HTML_SPACE_RE.split(text)
+        content = ' '.join(word for word in words if word)
+        if not content:
+            self.space = True
+            return
+        if (self.space or not words[0]) and not self.after_block:
+            out.append(' ')
+        out.append(content)
+        self.space = not words[-1]
+        self.after_block = False
+
+    def _tag(self, tag, out):
+        if tag.startswith('<!--'):
+            return
+        name = TAG_NAME_RE.match(tag)
+        name = name.group(1).lower() if name else None
+        block = name is None or name in BLOCK_TAGS
+        if self.space and not block and not self.after_block:
+            out.append(' ')
+        out.append(tag)
+        self.space = False
+        self.after_block = block
+        if name in RAW_TAGS and not tag.startswith('</') and not tag.endswith('/>'):
+            self.raw = name
+
+def minify_html(chunks):
+    minifier = HtmlMinifier()
+    for chunk in chunks:
+        chunk = minifier.feed(chunk)
+        if chunk:
+            yield chunk
+
+CSS_STRING_RE = re.compile(r'''("(?:\\.|[^"\\])*"|'(?:\\.|[^'\\])*')''', re.S)
+CSS_COMMENT_RE = re.compile(r'''("(?:\\.|[^"\\])*"|'(?:\\.|[^'\\])*')|/\*.*?\*/''', re.S)
+CSS_PUNCT_SPACE_RE = re.compile(r'\s*([{};,>])\s*')
+
+def _squeeze_css(css):
+    css = CSS_PUNCT_SPACE_RE.sub(r'\1', re.sub(r'\s+', ' ', css))
+    return re.sub(r':\s+', ':', css).replace(';}', '}')
+
+# Drop comments and whitespace that does not separate tokens; string
+# literals are kept as written
+def minify_css(css):
+    css = CSS_COMMENT_RE.sub(lambda m: m.group(1) or ' ', css)
+    out = []
+    pos = 0
+    for match in CSS_STRING_RE.finditer(css):
+        out.append(_squeeze_css(css[pos:match.start()]))
+        out.append(match.group())
+        pos = match.end()
+    out.append(_squeeze_css(css[pos:]))
+    return ''.join(out).strip()
+
+JS_SPACE = ' \t\r\n\f\v'
+JS_WORD_RE = re.compile(r'[\w$]+')
+
+# A newline is only kept between these, where automatic semicolon insertion
+# could depend on it (JSMin's rule); elsewhere it is dropped like a space
+JS_NEWLINE_BEFORE = set(')]}\'"`+-/')
+JS_NEWLINE_AFTER = set('([{\'"`+-!~/')
+
+# Keywords after which a slash starts a regular expression, not a division
+JS_REGEX_KEYWORDS = {
+    'return', 'typeof', 'case', 'do', 'else', 'in', 'instanceof', 'new',
+    'delete', 'void', 'throw', 'yield', 'await', 'of'
+}
+
+def _js_word_char(c):
+    return c.isalnum() or c in '_$\\' or ord(c) > 127
+
+def _scan_js_string(src, i):
+    quote = src[i]
+    i += 1
+    while i < len(src) and src[i] != quote:
+        i += 2 if src[i] == '\\' else 1
+    return i + 1
+
+def _scan_js_regex(src, i):
+    i += 1
+    in_class = False
+    while i < len(src):
+        c = src[i]
+        if c == '\\':
+            i += 2
+            continue
+        if c == '[':
+            in_class = True
+        elif c == ']':
+            in_class = False
+        elif c == '/' and not in_class:
+            break
+        i += 1
+    i += 1
+    while i < len(src) and src[i].isalpha():
+        i += 1
+    return i
+
+# Template literal starting at src[i], including nested ${...} expressions
+def _scan_js_template(src, i):
+    i += 1
+    while i < len(src):
+        c = src[i]
+        if c == '\\':
+            i += 2
+        elif c == '`':
+            return i + 1
+        elif src.startswith('${', i):
+            i += 2
+            depth = 1
+            while i < len(src) and depth:
+                c = src[i]
+                if c in '\'"':
+                    i = _scan_js_string(src, i)
+                    continue
+                if c == '`':
+                    i = _scan_js_template(src, i)
+                    continue
+                depth += (c == '{') - (c == '}')
+                i += 1
+        else:
+            i += 1
+    return i
+
+# JSMin-style pass over the page script: drops comments and whitespace that
+# neither separates tokens nor ends a statement. Strings, template literals
+# and regular expressions are copied as written. Used on each script chunk,
+# which must start and end between tokens
+def minify_js(src):
+    out = []
+    last = ''
+    last_word = ''
+    space = ''
+    i = 0
+    n = len(src)
+    while i < n:
+        c = src[i]
+        if c in JS_SPACE:
+            if c == '\n' or c == '\r':
+                space = '\n'
+            elif not space:
+                space = ' '
+            i += 1
+            continue
+        if src.startswith('//', i):
+            end = src.find('\n', i)
+            i = n if end < 0 else end
+            continue
+        if src.startswith('/*', i):
+            end = src.find('*/', i + 2)
+            comment = src[i:n if end < 0 else end + 2]
+            space = '\n' if '\n' in comment or space == '\n' else ' '
+            i += len(comment)
+            continue
+
+        if space:
+            word_edge = (not last or _js_word_char(last)) and _js_word_char(c)
+            if space == '\n' and (not last or _js_word_char(last) or last in JS_NEWLINE_BEFORE) \
+                    and (_js_word_char(c) or c in JS_NEWLINE_AFTER):
+                out.append('\n')
+            elif word_edge or (last in '+-' and c == last) or (last == '/' and c == '/'):
+                out.append(' ')
+            space = ''
+
+        word = ''
+        if c in '\'"':
+            end = _scan_js_string(src, i)
+        elif c == '`':
+            end = _scan_js_template(src, i)
+        elif c == '/' and (not last or last_word in JS_REGEX_KEYWORDS
+                           or not (_js_word_char(last) or last in ')]}\'"`')):
+            end = _scan_js_regex(src, i)
+        elif _js_word_char(c):
+            match = JS_WORD_RE.match(src, i)
+            end = match.end() if match and match.end() > i else i + 1
+            word = src[i:end]
+        else:
+            end = i + 1
+        out.append(src[i:end])
+        last = src[end - 1]
+        last_word = word
+        i = end
+    if space and (_js_word_char(last) or last in JS_NEWLINE_BEFORE):
+        out.append(space)
+    return ''.join(out)
+
+# Write the page chunks to disk as they are produced
+def write_page(chunks, out_path, profile=NULL_PROFILE, minify=False):
+    if minify:
+        chunks = minify_html(chunks)
+    with open(out_path, 'w', encoding='utf-8') as f:
+        for chunk in chunks:
+            with profile.measure('write'):
+                f.write(chunk)
+    profile.add_output('write', os.path.getsize(out_path))
+
+# Directory next to the page that --split-assets and --fonts write into
+ASSET_DIR = 'assets'
+
+# Hex digits of the content hash in asset file names
+ASSET_HASH_LENGTH = 12
+
+# Suffix of the file in assets/ that lists the assets a page's last build
+# wrote, named after the page; a rebuild removes only files listed there
+ASSET_MANIFEST_SUFFIX = '.assets.json'
+
+def read_asset_manifest(path):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            names = json.load(f)
+    except (OSError, ValueError):
+        return []
+    return [name for name in names if isinstance(name, str) and os.path.basename(name) == name]
+
+# Writes stylesheet, script, data and font files named after a hash of their
+# content, so a host can serve them with an immutable Cache-Control header
+class AssetWriter:
+    def __init__(self, out_dir):
+        self.out_dir = out_dir
+        self.written = {}
+
+    # Stream chunks into assets/<name>.<hash><ext>; returns its URL relative
+    # to the page. Shards sharing an identical asset share the file
+    def write(self, name, ext, chunks):
+        asset_dir = os.path.join(self.out_dir, ASSET_DIR)
+        os.makedirs(asset_dir, exist_ok=True)
+        digest = hashlib.sha256()
+        fd, tmp_path = tempfile.mkstemp(dir=asset_dir, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                for chunk in chunks:
+                    if isinstance(chunk, str):
+                        chunk = chunk.encode('utf-8')
+                    digest.update(chunk)
+                    f.write(chunk)
+            url = f'{ASSET_DIR}/{name}.{digest.hexdigest()[:ASSET_HASH_LENGTH]}{ext}'
+            path = os.path.join(self.out_dir, url)
+            os.chmod(tmp_path, 0o644)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        self.written[path] = None
+        return url
+
+    # Record the files in assets/ among written, the paths this build wrote
+    # for the page at out_path, in that page's manifest. Files its previous
+    # manifest listed are removed unless this build or another page's
+    # manifest still lists them; nothing else in the directory is touched
+    def prune(self, out_path, written):
+        asset_dir = os.path.abspath(os.path.join(self.out_dir, ASSET_DIR))
+        page = os.path.splitext(os.path.basename(out_path))[0]
+        manifest_path = os.path.join(asset_dir, page + ASSET_MANIFEST_SUFFIX)
+        names = [os.path.basename(path) for path in written
+                 if os.path.dirname(os.path.abspath(path)) == asset_dir]
+        stale = set(read_asset_manifest(manifest_path)).difference(names)
+        for entry in os.scandir(asset_dir):
+            if stale and entry.name.endswith(ASSET_MANIFEST_SUFFIX) and entry.path != manifest_path:
+                stale.difference_update(read_asset_manifest(entry.path))
+        for name in stale:
+            path = os.path.join(asset_dir, name)
+            if os.path.isfile(path):
+                os.remove(path)
+        with open(manifest_path, 'w', encoding='utf-8') as f:
+            json.dump(sorted(names), f, indent=2)
+
+# Write path.gz, and path.br when the brotli module is installed, at maximum
+# compression for hosts that serve precompressed files. gzip output is
+# byte-identical between builds of the same file
+def precompress(path):
+    with open(path, 'rb') as src, open(path + '.gz', 'wb') as dst:
+        with gzip.GzipFile(filename='', mode='wb', compresslevel=9, fileobj=dst, mtime=0) as gz:
+            shutil.copyfileobj(src, gz, STREAM_CHUNK_SIZE)
+    written = [path + '.gz']
+    if brotli is not None:
+        compressor = brotli.Compressor(quality=11)
+        with open(path, 'rb') as src, open(path + '.br', 'wb') as dst:
+            for block in iter(lambda: src.read(STREAM_CHUNK_SIZE), b''):
+                dst.write(compressor.process(block))
+            dst.write(compressor.finish())
+        written.append(path + '.br')
+    return written
+
+# Faces of the page stylesheet that --fonts looks for, by the file names of
+# the IBM Plex release: (family, weight, file name without extension)
+FONT_FACES = [
+    ('IBM Plex Sans', 300, 'IBMPlexSans-Light'),
+    ('IBM Plex Sans', 400, 'IBMPlexSans-Regular'),
+    ('IBM Plex Sans', 500, 'IBMPlexSans-Medium'),
+    ('IBM Plex Sans', 600, 'IBMPlexSans-SemiBold'),
+    ('IBM Plex Sans', 700, 'IBMPlexSans-Bold'),
+    ('IBM Plex Mono', 400, 'IBMPlexMono-Regular'),
+    ('IBM Plex Mono', 500, 'IBMPlexMono-Medium'),
+]
+
+# Accepted font file extensions, in order of preference
+FONT_EXTENSIONS = ['.woff2', '.woff', '.ttf', '.otf']
+
+# MIME types of the subset font formats, for the preload links
+FONT_MIME_TYPES = {'woff2': 'font/woff2', 'woff': 'font/woff'}
+
+# Characters the page template renders besides the dataset's own text
+TEMPLATE_CHARACTERS = ''.join(map(chr, range(0x20, 0x7f))) + '★☆–×'
+
+def collect_characters(value, chars):
+    if isinstance(value, str):
+        chars.update(value)
+    elif isinstance(value, dict):
+        for item in value.values():
+            collect_characters(item, chars)
+    elif isinstance(value, list):
+        for item in value:
+            collect_characters(item, chars)
+
+# Every character the site can render: the template plus each string in the
+# dataset, including ones only shown once a modal is built in the browser
+def site_characters(data):
+    chars = set(TEMPLATE_CHARACTERS)
+    for key, value in data.items():
+        if key == 'ingredients':
+            for ing in value:
+                collect_characters(ing, chars)
+        else:
+            collect_characters(value, chars)
+    return ''.join(sorted(chars))
+
+# WOFF2 (WOFF when brotli is missing) of the font at path, cut down to the
+# glyphs of text; returns (content, format). The source's timestamp is kept
+# so an unchanged font gets the same asset hash in every build
+def subset_font(path, text):
+    options = font_subset.Options()
+    options.flavor = 'woff2' if brotli is not None else 'woff'
+    font = TTFont(path, recalcTimestamp=False)
+    subsetter = font_subset.Subsetter(options)
+    subsetter.populate(text=text)
+    subsetter.subset(font)
+    out = io.BytesIO()
+    font_subset.save_font(font, out, options)
+    return out.getvalue(), options.flavor
+
+# Copy of data whose 'fontFaces' lists the FONT_FACES found in font_dir, each
+# subset to site_characters() and written as an asset for render_font_links().
+# Requires fontTools: whole font files would be far larger than Google Fonts'
+def with_fonts(data, font_dir, assets):
+    if font_subset is None:
+        raise ImportError('--fonts subsets the fonts with fontTools; install it with pip install fonttools brotli')
+    text = None
+    faces = []
+    for family, weight, name in FONT_FACES:
+        for ext in FONT_EXTENSIONS:
+            path = os.path.join(font_dir, name + ext)
+            if os.path.exists(path):
+                break
+        else:
+            continue
+        if text is None:
+            text = site_characters(data)
+        content, fmt = subset_font(path, text)
+        url = assets.write(name, '.' + fmt, [content])
+        faces.append({'family': family, 'weight': weight, 'url': url, 'format': fmt})
+    if not faces:
+        names = ', '.join(name for _, _, name in FONT_FACES)
+        raise FileNotFoundError(f'No font files found in {font_dir}; expected any of {names} '
+                                f'as {"/".join(FONT_EXTENSIONS)}')
+    data = dict(data)
+    data['fontFaces'] = faces
+    return data
+
+# Render the site for an already loaded dataset and write it to out_path;
+# returns the paths of every page written, followed by any asset files and
+# precompressed copies. Raises DatasetError before writing anything if the
+# dataset does not match the schema
+def build_site(data, out_path, options=None, cache=None, profile=NULL_PROFILE):
+    if options is None:
+        options = BuildOptions()
+    profile.call('validate', validate_data, data)
+    fragment_cache = None
+    if cache is None and options.cache_dir:
+        cache = fragment_cache = FragmentCache(options.cache_dir)
+    with profile.measure('prepare'):
+        data = with_stats(with_references(data))
+        if options.pubmed_cache:
+            data = with_citations(data, options.pubmed_cache)
+    asset_writer = AssetWriter(os.path.dirname(out_path))
+    if options.fonts:
+        data = with_fonts(data, options.fonts, asset_writer)
+    assets = asset_writer if options.split_assets else None
+    with ProcessPoolExecutor(options.jobs) if options.jobs > 1 else nullcontext() as pool:
+        if options.shard == 'none':
+            write_page(iter_page(data, options, cache, pool, profile=profile, assets=assets), out_path,
+                       profile, options.minify)
+            written = [out_path]
+        else:
+            written = write_shards(data, out_path, options, cache, pool, profile, assets)
+    if cache is not None:
+        cache.save()
+    if fragment_cache is not None:
+        fragment_cache.close()
+    written += asset_writer.written
+    if options.precompress:
+        written += [copy for path in list(written) for copy in precompress(path)]
+    if asset_writer.written:
+        asset_writer.prune(out_path, written)
+    return written
+
+# Seconds between checks of the input file in --watch mode
+WATCH_INTERVAL = 0.2
+
+# Rebuild out_path whenever input_path changes, keeping fragments in memory
+def watch(input_path, out_path, options):
+    cache = IngredientDiffCache()
+    last_stat = None
+    print(f"Watching {input_path} for changes (Ctrl+C to stop)")
+    try:
+        while True:
+            try:
+                stat = os.stat(input_path)
+            except FileNotFoundError:
+                stat = None
+            signature = stat and (stat.st_mtime_ns, stat.st_size)
+            if signature and signature != last_stat:
+                last_stat = signature
+                started = time.perf_counter()
+                try:
+                    data = load_data(input_path)
+                except ValueError as e:
+                    # Usually a save still in progress; the next write retriggers
+                    print(f"Skipping rebuild, {input_path} is not valid JSON: {e}")
+                else:
+                    try:
+                        build_site(data, out_path, options, cache)
+                    except DatasetError as e:
+                        print(f"Skipping rebuild, {input_path} has {e}")
+                    else:
+                        elapsed = (time.perf_counter() - started) * 1000
+                        print(f"Rebuilt {out_path} in {elapsed:.0f} ms "
+                              f"({len(cache.last_changed)} of {len(data['ingredients'])} ingredients changed)")
+            time.sleep(WATCH_INTERVAL)
+    except KeyboardInterrupt:
+        pass
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Generate ingredients.html from research.json')
+    parser.add_argument('-i', '--input', default='research.json',
+                        help='research dataset to read (default: research.json)')
+    parser.add_argument('-o', '--output', default='ingredients.html',
+                        help='HTML page to write (default: ingredients.html)')
+    parser.add_argument('--modals', choices=['eager', 'lazy'],
+                        help='emit every modal into the page, or build each one in the browser on first open '
+                             '(default: eager, lazy with --grid virtual)')
+    parser.add_argument('--grid', choices=['static', 'virtual'], default='static',
+                        help='render every card into the page, or only the first screenful and create the '
+                             'rest in the browser as they scroll into view; implies --modals lazy')
+    parser.add_argument('--search', choices=['main', 'worker'], default='main',
+                        help='match searches and filters on the page itself, or in a Web Worker that '
+                             'holds the search index, with keystrokes debounced')
+    parser.add_argument('--payload', choices=['json', 'columnar'], default='json',
+                        help='encoding of the ingredient records embedded for --modals lazy: one JSON object '
+                             'per record, or columns with a shared table of repeated strings')
+    parser.add_argument('--cache-dir', metavar='DIR',
+                        help='reuse cards and modals of unchanged ingredients from earlier builds, kept in DIR')
+    parser.add_argument('--shard', choices=['none', 'category', 'pages'], default='none',
+                        help='write one page per category or per --page-size ingredients, '
+                             'with the output as an index page linking to them')
+    parser.add_argument('--page-size', type=int, default=500,
+                        help='ingredients per page with --shard pages (default: 500)')
+    parser.add_argument('--pubmed-cache',
+                        help='SQLite cache written by pubmed_fetcher.py; adds citation tooltips to reference links')
+    parser.add_argument('-j', '--jobs', type=int, default=1,
+                        help='render cards and modals in N worker processes (0 uses every CPU)')
+    parser.add_argument('--stream', action='store_true',
+                        help='decode ingredients one record at a time on each pass instead of '
+                             'loading them all (always on for .jsonl input)')
+    parser.add_argument('--watch', action='store_true',
+                        help='keep running and rebuild whenever the input changes')
+    parser.add_argument('--split-assets', action='store_true',
+                        help=f'write the stylesheet, page script and page data to content-hashed files '
+                             f'in {ASSET_DIR}/ next to the output instead of inlining them')
+    parser.add_argument('--fonts', metavar='DIR',
+                        help=f'self-host the IBM Plex files found in DIR (IBMPlexSans-Regular.ttf etc.) in '
+                             f'{ASSET_DIR}/ instead of loading Google Fonts, subset to the characters used '
+                             f'(needs fontTools; WOFF2 also needs brotli)')
+    parser.add_argument('--minify', action='store_true',
+                        help='collapse whitespace in the HTML and minify the stylesheet and page script')
+    parser.add_argument('--precompress', action='store_true',
+                        help='also write .gz copies of every output file at maximum compression, '
+                             'and .br copies when the brotli module is installed')
+    parser.add_argument('--profile', action='store_true',
+                        help='report time, peak allocation and output size of each build stage')
+    parser.add_argument('--profile-output', metavar='FILE',
+                        help='write cProfile stats of the build to FILE, for pstats or snakeviz '
+                             '(covers this process only, not --jobs workers)')
+    args = parser.parse_args(argv)
+    if args.page_size < 1:
+        parser.error('--page-size must be at least 1')
+    if args.pubmed_cache and not os.path.exists(args.pubmed_cache):
+        parser.error(f'--pubmed-cache {args.pubmed_cache} does not exist; run pubmed_fetcher.py first')
+    if args.grid == 'virtual' and args.modals == 'eager':
+        parser.error('--grid virtual builds modals on first open and cannot be used with --modals eager')
+    if args.modals is None:
+        args.modals = 'lazy' if args.grid == 'virtual' else 'eager'
+    if args.payload == 'columnar' and args.modals != 'lazy':
+        parser.error('--payload columnar encodes the records of lazy modals and needs --modals lazy')
+    if args.fonts and font_subset is None:
+        parser.error('--fonts subsets the fonts with fontTools; install it with pip install fonttools brotli')
+    if args.watch and (args.profile or args.profile_output):
+        parser.error('--profile and --profile-output profile a single build and cannot be used with --watch')
+
+    options = BuildOptions(
+        modals=args.modals,
+        cache_dir=args.cache_dir,
+        jobs=args.jobs or os.cpu_count(),
+        shard=args.shard,
+        page_size=args.page_size,
+        pubmed_cache=args.pubmed_cache,
+        split_assets=args.split_assets,
+        precompress=args.precompress,
+        minify=args.minify,
+        payload=args.payload,
+        grid=args.grid,
+        search=args.search,
+        fonts=args.fonts
+    )
+    if args.watch:
+        watch(args.input, args.output, options)
+        return
+
+    profile = BuildProfile() if args.profile else NULL_PROFILE
+    if args.profile:
+        profile.start()
+    data = profile.call('load', load_data, args.input, args.stream)
+    try:
+        if args.profile_output:
+            profiler = cProfile.Profile()
+            written = profiler.runcall(build_site, data, args.output, options, profile=profile)
+            profiler.dump_stats(args.profile_output)
+        else:
+            written = build_site(data, args.output, options, profile=profile)
+    except DatasetError as e:
+        parser.exit(1, f"{args.input} has {e}\n")
+    if args.profile:
+        profile.stop()
+
+    print(f"Generated {args.output} with {len(data['ingredients'])} ingredients")
+    pages = [path for path in written if path.endswith(os.path.splitext(args.output)[1])]
+    if len(pages) > 1:
+        print(f"Wrote {len(pages) - 1} section pages alongside it")
+    if len(written) > len(pages):
+        print(f"Wrote {len(written) - len(pages)} asset and precompressed files")
+    if args.profile:
+        print(profile.report())
+    if args.profile_output:
+        print(f"Wrote cProfile stats to {args.profile_output}")
+    print(f"Open {args.output} in your browser to view the website")
 
-print("Generated ingredients.html with 40 ingredients")
-print("Open ingredients.html in your browser to view the website")
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,99 @@
+"""Persistent SQLite cache of PubMed metadata keyed by PMID"""
+
+import json
+import sqlite3
+import time
+
+DEFAULT_CACHE_PATH = 'pubmed-cache.sqlite'
+
+# Records older than this are fetched again by pubmed_fetcher.py
+DEFAULT_TTL = 30 * 24 * 60 * 60
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS articles (
+    pmid TEXT PRIMARY KEY,
+    title TEXT NOT NULL,
+    authors TEXT NOT NULL,
+    journal TEXT NOT NULL,
+    year INTEGER,
+    abstract TEXT NOT NULL,
+    fetched_at REAL NOT NULL
+)
+'''
+
+# Title, authors, journal, year and abstract of each PMID, as returned by
+# PubMedFetcher.fetch(), plus when it was fetched
+class PubMedCache:
+    def __init__(self, path=DEFAULT_CACHE_PATH, ttl=DEFAULT_TTL):
+        self.path = path
+        self.ttl = ttl
+        self.db = sqlite3.connect(path)
+        self.db.execute(SCHEMA)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.db.close()
+
+    @staticmethod
+    def _record(row):
+        pmid, title, authors, journal, year, abstract, fetched_at = row
+        return {
+            'pmid': pmid,
+            'title': title,
+            'authors': json.loads(authors),
+            'journal': journal,
+            'year': year,
+            'abstract': abstract,
+            'fetchedAt': fetched_at
+        }
+
+    def get(self, pmid):
+        row = self.db.execute('SELECT * FROM articles WHERE pmid = ?', (str(pmid),)).fetchone()
+        return self._record(row) if row else None
+
+    # pmid -> record for every cached PMID in pmids; all cached records if None
+    def get_many(self, pmids=None):
+        if pmids is None:
+            rows = self.db.execute('SELECT * FROM articles')
+            return {row[0]: self._record(row) for row in rows}
+        records = {}
+        for pmid in pmids:
+            record = self.get(pmid)
+            if record is not None:
+                records[record['pmid']] = record
+        return records
+
+    # PMIDs that are missing or were fetched more than ttl seconds ago
+    def stale(self, pmids, now=None):
+        cutoff = (time.time() if now is None else now) - self.ttl
+        stale = []
+        for pmid in dict.fromkeys(str(p) for p in pmids):
+            row = self.db.execute('SELECT fetched_at FROM articles WHERE pmid = ?', (pmid,)).fetchone()
+            if row is None or row[0] < cutoff:
+                stale.append(pmid)
+        return stale
+
+    def put_many(self, records, fetched_at=None):
+        fetched_at = time.time() if fetched_at is None else fetched_at
+        with self.db:
+            self.db.executemany(
+                'INSERT OR REPLACE INTO articles VALUES (?, ?, ?, ?, ?, ?, ?)',
+                [(r['pmid'], r['title'], json.dumps(r['authors'], ensure_ascii=False), r['journal'],
+                  r['year'], r['abstract'], fetched_at) for r in records]
+            )
+
+# Short citation shown on reference links, e.g. "Doe J et al., J Test (2019): Title."
+def citation_label(record):
+    authors = record['authors']
+    label = ''
+    if authors:
+        label = authors[0] + (' et al.' if len(authors) > 1 else '') + ', '
+    label += record['journal']
+    if record['year']:
+        label += f" ({record['year']})"
+    return f"{label}: {record['title']}"
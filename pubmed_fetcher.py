@@ -0,0 +1,292 @@
+#!/usr/bin/env python3
+"""Fetch PubMed metadata for research.json PMIDs through NCBI E-utilities"""
+
+import argparse
+import asyncio
+import json
+import random
+import re
+import ssl
+import time
+import xml.etree.ElementTree as ET
+from urllib.parse import urlencode, urlsplit
+
+from pubmed_cache import DEFAULT_CACHE_PATH, DEFAULT_TTL, PubMedCache
+
+EUTILS_BASE_URL = 'https://eutils.ncbi.nlm.nih.gov/entrez/eutils/'
+
+# NCBI accepts up to 200 ids per ESummary/EFetch GET request
+MAX_IDS_PER_REQUEST = 200
+
+# NCBI request limits: 3/second without an API key, 10/second with one
+DEFAULT_RATE = 3.0
+API_KEY_RATE = 10.0
+
+# Responses worth retrying: rate limited or a transient server failure
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+class EUtilsError(Exception):
+    pass
+
+# Spaces requests evenly at `rate` per second, allowing `burst` back to back
+class TokenBucket:
+    def __init__(self, rate, burst=1):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+# Minimal HTTP/1.1 client keeping up to `size` keep-alive connections to one host
+class ConnectionPool:
+    def __init__(self, base_url, size=3, timeout=30):
+        parts = urlsplit(base_url)
+        self.host = parts.hostname
+        self.tls = parts.scheme == 'https'
+        self.port = parts.port or (443 if self.tls else 80)
+        self.base_path = parts.path if parts.path.endswith('/') else parts.path + '/'
+        self.timeout = timeout
+        self.idle = []
+        self.slots = asyncio.Semaphore(size)
+
+    async def _connect(self):
+        context = ssl.create_default_context() if self.tls else None
+        return await asyncio.open_connection(self.host, self.port, ssl=context)
+
+    async def _exchange(self, conn, target):
+        reader, writer = conn
+        writer.write(
+            f'GET {target} HTTP/1.1\r\n'
+            f'Host: {self.host}\r\n'
+            'User-Agent: blueprint-research-pubmed-fetcher\r\n'
+            'Accept-Encoding: identity\r\n'
+            'Connection: keep-alive\r\n\r\n'.encode('ascii')
+        )
+        await writer.drain()
+
+        status_line = await reader.readline()
+        if not status_line:
+            raise ConnectionResetError('connection closed before response')
+        version, status = status_line.decode('latin-1').split(None, 2)[:2]
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+
+        keep_alive = version == 'HTTP/1.1' and headers.get('connection', '').lower() != 'close'
+        if headers.get('transfer-encoding', '').lower() == 'chunked':
+            chunks = []
+            while True:
+                size = int((await reader.readline()).split(b';')[0], 16)
+                if size == 0:
+                    while (await reader.readline()) not in (b'\r\n', b'\n', b''):
+                        pass
+                    break
+                chunks.append(await reader.readexactly(size))
+                await reader.readexactly(2)
+            body = b''.join(chunks)
+        elif 'content-length' in headers:
+            body = await reader.readexactly(int(headers['content-length']))
+        else:
+            body = await reader.read()
+            keep_alive = False
+        return int(status), headers, body, keep_alive
+
+    # GET base_url + path?params; returns (status, headers, body)
+    async def get(self, path, params):
+        target = self.base_path + path + '?' + urlencode(params)
+        async with self.slots:
+            reused = bool(self.idle)
+            conn = self.idle.pop() if reused else await self._connect()
+            try:
+                result = await asyncio.wait_for(self._exchange(conn, target), self.timeout)
+            except (OSError, asyncio.IncompleteReadError, asyncio.TimeoutError, ValueError):
+                conn[1].close()
+                if not reused:
+                    raise
+                # The server may have dropped an idle keep-alive connection
+                conn = await self._connect()
+                try:
+                    result = await asyncio.wait_for(self._exchange(conn, target), self.timeout)
+                except BaseException:
+                    conn[1].close()
+                    raise
+            status, headers, body, keep_alive = result
+            if keep_alive:
+                self.idle.append(conn)
+            else:
+                conn[1].close()
+            return status, headers, body
+
+    async def close(self):
+        while self.idle:
+            _, writer = self.idle.pop()
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except OSError:
+                pass
+
+# Batched, rate-limited ESummary/EFetch client for PubMed
+class PubMedFetcher:
+    def __init__(self, base_url=EUTILS_BASE_URL, api_key=None, email=None, rate=None,
+                 connections=3, retries=5, backoff=1.0, tool='blueprint-research'):
+        self.pool = ConnectionPool(base_url, connections)
+        self.bucket = TokenBucket(rate or (API_KEY_RATE if api_key else DEFAULT_RATE))
+        self.retries = retries
+        self.backoff = backoff
+        self.params = {'db': 'pubmed', 'tool': tool}
+        if email:
+            self.params['email'] = email
+        if api_key:
+            self.params['api_key'] = api_key
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.pool.close()
+
+    # One E-utilities call with rate limiting and exponential backoff on
+    # rate limits, server errors and dropped connections
+    async def request(self, path, params):
+        params = {**self.params, **params}
+        for attempt in range(self.retries + 1):
+            await self.bucket.acquire()
+            try:
+                status, headers, body = await self.pool.get(path, params)
+            except (OSError, asyncio.IncompleteReadError, asyncio.TimeoutError) as e:
+                error, retry_after = f'{type(e).__name__}: {e}', None
+            else:
+                if status == 200:
+                    return body
+                if status not in RETRY_STATUSES:
+                    raise EUtilsError(f'{path} returned HTTP {status}: {body[:200]!r}')
+                error, retry_after = f'HTTP {status}', headers.get('retry-after')
+            if attempt == self.retries:
+                raise EUtilsError(f'{path} failed after {self.retries + 1} attempts: {error}')
+            delay = self.backoff * 2 ** attempt * (1 + random.random() / 2)
+            if retry_after and retry_after.isdigit():
+                delay = max(delay, int(retry_after))
+            await asyncio.sleep(delay)
+
+    # ESummary for up to MAX_IDS_PER_REQUEST PMIDs: pmid -> summary fields
+    async def esummary(self, pmids):
+        body = await self.request('esummary.fcgi', {'id': ','.join(pmids), 'retmode': 'json'})
+        result = json.loads(body).get('result', {})
+        summaries = {}
+        for pmid in result.get('uids', []):
+            item = result.get(pmid, {})
+            if 'error' in item:
+                continue
+            year = re.search(r'\d{4}', item.get('pubdate', ''))
+            summaries[pmid] = {
+                'pmid': pmid,
+                'title': item.get('title', ''),
+                'authors': [a['name'] for a in item.get('authors', []) if a.get('name')],
+                'journal': item.get('fulljournalname') or item.get('source', ''),
+                'year': int(year.group()) if year else None
+            }
+        return summaries
+
+    # EFetch XML for up to MAX_IDS_PER_REQUEST PMIDs: pmid -> abstract text
+    async def efetch_abstracts(self, pmids):
+        body = await self.request('efetch.fcgi', {'id': ','.join(pmids), 'retmode': 'xml'})
+        abstracts = {}
+        for article in ET.fromstring(body).iter('PubmedArticle'):
+            pmid = article.findtext('MedlineCitation/PMID')
+            sections = []
+            for part in article.iterfind('MedlineCitation/Article/Abstract/AbstractText'):
+                text = ''.join(part.itertext()).strip()
+                label = part.get('Label')
+                sections.append(f'{label}: {text}' if label else text)
+            abstracts[pmid] = '\n'.join(sections)
+        return abstracts
+
+    # Title, authors, journal, year and abstract for every PMID found;
+    # batches run concurrently within the rate limit
+    async def fetch(self, pmids):
+        pmids = list(dict.fromkeys(str(p) for p in pmids))
+        batches = [pmids[i:i + MAX_IDS_PER_REQUEST] for i in range(0, len(pmids), MAX_IDS_PER_REQUEST)]
+        summary_batches, abstract_batches = await asyncio.gather(
+            asyncio.gather(*(self.esummary(batch) for batch in batches)),
+            asyncio.gather(*(self.efetch_abstracts(batch) for batch in batches))
+        )
+        abstracts = {}
+        for batch in abstract_batches:
+            abstracts.update(batch)
+        records = {}
+        for batch in summary_batches:
+            for pmid, summary in batch.items():
+                records[pmid] = {**summary, 'abstract': abstracts.get(pmid, '')}
+        return records
+
+# Every PMID cited by the research dataset, in order of first appearance;
+# PubMed Central references are not PubMed records and are skipped
+def collect_pmids(data):
+    if 'references' in data:
+        return list(dict.fromkeys(ref['pmid'] for ref in data['references'] if 'pmid' in ref))
+    pmids = {}
+    for ing in data['ingredients']:
+        for ev in ing['researchEvidence']:
+            for pmid in ev.get('pmids', []):
+                pmids[str(pmid)] = None
+    return list(pmids)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Fetch PubMed metadata for every PMID in research.json')
+    parser.add_argument('-i', '--input', default='research.json',
+                        help='research dataset to read PMIDs from (default: research.json)')
+    parser.add_argument('-o', '--output',
+                        help='also write the metadata of every cited PMID to this JSON file, keyed by PMID')
+    parser.add_argument('--cache', default=DEFAULT_CACHE_PATH,
+                        help=f'SQLite metadata cache to read and update (default: {DEFAULT_CACHE_PATH})')
+    parser.add_argument('--ttl-days', type=float, default=DEFAULT_TTL / 86400,
+                        help='refetch cached records older than this many days (default: 30)')
+    parser.add_argument('--base-url', default=EUTILS_BASE_URL,
+                        help='E-utilities endpoint, e.g. a local stub server for testing')
+    parser.add_argument('--api-key', help='NCBI API key, raises the rate limit to 10 requests/second')
+    parser.add_argument('--email', help='contact address NCBI asks clients to send')
+    parser.add_argument('--rate', type=float, help='requests per second (default: NCBI limit)')
+    args = parser.parse_args(argv)
+
+    with open(args.input, 'r', encoding='utf-8') as f:
+        pmids = collect_pmids(json.load(f))
+
+    async def run(stale):
+        async with PubMedFetcher(args.base_url, api_key=args.api_key, email=args.email,
+                                 rate=args.rate) as fetcher:
+            return await fetcher.fetch(stale)
+
+    with PubMedCache(args.cache, ttl=args.ttl_days * 86400) as cache:
+        stale = cache.stale(pmids)
+        started = time.perf_counter()
+        fetched = asyncio.run(run(stale)) if stale else {}
+        cache.put_many(fetched.values())
+        print(f"Fetched {len(fetched)} of {len(stale)} stale PMIDs in {time.perf_counter() - started:.1f}s "
+              f"({len(pmids) - len(stale)} of {len(pmids)} served from {args.cache})")
+
+        records = cache.get_many(pmids)
+        missing = [pmid for pmid in pmids if pmid not in records]
+        if missing:
+            print(f"Not found: {', '.join(missing)}")
+        if args.output:
+            with open(args.output, 'w', encoding='utf-8') as f:
+                json.dump(records, f, indent=2, ensure_ascii=False)
+
+if __name__ == '__main__':
+    main()
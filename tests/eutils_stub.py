@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""Local stand-in for NCBI E-utilities ESummary/EFetch, for testing pubmed_fetcher.py"""
+
+import argparse
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+from xml.sax.saxutils import escape
+
+# Bytes per chunk when responses are sent with Transfer-Encoding: chunked
+CHUNK_SIZE = 1024
+
+# Summary fields the stub returns for a PMID; PMIDs starting with 9 are unknown
+def summary(pmid):
+    return {
+        'uid': pmid,
+        'title': f'Article {pmid}',
+        'authors': [{'name': f'Author{pmid} A'}, {'name': 'Second B'}],
+        'fulljournalname': 'Journal of Stub Studies',
+        'pubdate': '2019 Mar 4'
+    }
+
+def abstract(pmid):
+    return f'Abstract of {pmid} & more.'
+
+def esummary_body(pmids):
+    result = {'uids': pmids}
+    for pmid in pmids:
+        result[pmid] = {'uid': pmid, 'error': 'cannot get document summary'} if pmid.startswith('9') else summary(pmid)
+    return json.dumps({'result': result}).encode()
+
+def efetch_body(pmids):
+    articles = ''.join(
+        f'<PubmedArticle><MedlineCitation><PMID>{pmid}</PMID><Article><Abstract>'
+        f'<AbstractText Label="BACKGROUND">{escape(abstract(pmid))}</AbstractText>'
+        f'</Abstract></Article></MedlineCitation></PubmedArticle>'
+        for pmid in pmids if not pmid.startswith('9')
+    )
+    return f'<?xml version="1.0"?><PubmedArticleSet>{articles}</PubmedArticleSet>'.encode()
+
+class EUtilsHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def setup(self):
+        super().setup()
+        with self.server.lock:
+            self.server.connections += 1
+
+    def do_GET(self):
+        server = self.server
+        url = urlsplit(self.path)
+        params = parse_qs(url.query)
+        pmids = params.get('id', [''])[0].split(',')
+        endpoint = url.path.rsplit('/', 1)[-1]
+        with server.lock:
+            server.requests.append((endpoint, pmids))
+            rate_limited = server.rate_limit > 0
+            if rate_limited:
+                server.rate_limit -= 1
+
+        if rate_limited:
+            self._respond(429, b'{"error":"API rate limit exceeded"}', {'Retry-After': '0'})
+        elif endpoint == 'esummary.fcgi':
+            self._respond(200, esummary_body(pmids), {'Content-Type': 'application/json'})
+        elif endpoint == 'efetch.fcgi':
+            self._respond(200, efetch_body(pmids), {'Content-Type': 'text/xml'})
+        else:
+            self._respond(404, b'unknown endpoint')
+        # Drop the connection without announcing it, as idle keep-alive
+        # connections are dropped by real servers
+        if server.drop_connections:
+            self.close_connection = True
+
+    def _respond(self, status, body, headers=()):
+        self.send_response(status)
+        for name, value in dict(headers).items():
+            self.send_header(name, value)
+        if self.server.chunked:
+            self.send_header('Transfer-Encoding', 'chunked')
+            self.end_headers()
+            for i in range(0, len(body), CHUNK_SIZE):
+                chunk = body[i:i + CHUNK_SIZE]
+                self.wfile.write(b'%x;ext=1\r\n%s\r\n' % (len(chunk), chunk))
+            self.wfile.write(b'0\r\nX-Trailer: done\r\n\r\n')
+        else:
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+# E-utilities stub on localhost; records every request as (endpoint, pmids)
+# and counts the connections clients opened. rate_limit answers that many
+# requests with 429 first, chunked sends bodies with chunked encoding and
+# drop_connections closes each connection after one response
+class EUtilsStub(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, port=0, rate_limit=0, chunked=False, drop_connections=False, verbose=False):
+        super().__init__(('127.0.0.1', port), EUtilsHandler)
+        self.lock = threading.Lock()
+        self.requests = []
+        self.connections = 0
+        self.rate_limit = rate_limit
+        self.chunked = chunked
+        self.drop_connections = drop_connections
+        self.verbose = verbose
+
+    @property
+    def base_url(self):
+        return f'http://127.0.0.1:{self.server_address[1]}/entrez/eutils/'
+
+    def __enter__(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self.shutdown()
+        self.server_close()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Serve a stub of the E-utilities ESummary/EFetch endpoints')
+    parser.add_argument('--port', type=int, default=8800, help='port to listen on (default: 8800)')
+    parser.add_argument('--rate-limit', type=int, default=0,
+                        help='answer the first N requests with HTTP 429')
+    parser.add_argument('--chunked', action='store_true', help='send responses with chunked encoding')
+    args = parser.parse_args(argv)
+    server = EUtilsStub(args.port, args.rate_limit, args.chunked, verbose=True)
+    print(f"Serving E-utilities stub at {server.base_url} "
+          f"(pubmed_fetcher.py --base-url {server.base_url})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == '__main__':
+    main()
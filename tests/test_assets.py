@@ -0,0 +1,46 @@
+import json
+import os
+
+import generate_website as site
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def load():
+    return site.load_data(os.path.join(ROOT, 'research.json'))
+
+def assets(out_dir):
+    return sorted(os.listdir(out_dir / site.ASSET_DIR))
+
+def build(out_dir, name, data=None, **options):
+    return site.build_site(data or load(), str(out_dir / name), site.BuildOptions(**options))
+
+def test_plain_build_leaves_assets_alone(tmp_path):
+    (tmp_path / 'assets').mkdir()
+    (tmp_path / 'assets' / 'logo.0123456789ab.png').write_bytes(b'png')
+    build(tmp_path, 'a.html')
+    assert assets(tmp_path) == ['logo.0123456789ab.png']
+
+def test_rebuild_removes_only_its_own_stale_assets(tmp_path):
+    (tmp_path / 'assets').mkdir()
+    (tmp_path / 'assets' / 'logo.0123456789ab.png').write_bytes(b'png')
+    build(tmp_path, 'a.html', split_assets=True)
+    first = assets(tmp_path)
+
+    data = load()
+    data['ingredients'][0]['name'] += ' (renamed)'
+    written = build(tmp_path, 'a.html', data, split_assets=True)
+    names = {os.path.basename(path) for path in written}
+    assert [name for name in first if name not in assets(tmp_path)] == \
+        [name for name in first if name.startswith('data.')]
+    assert set(assets(tmp_path)) == names - {'a.html'} | {'logo.0123456789ab.png', 'a.assets.json'}
+
+def test_pages_sharing_a_directory_keep_each_others_assets(tmp_path):
+    build(tmp_path, 'a.html', split_assets=True, precompress=True)
+    a_assets = json.loads((tmp_path / 'assets' / 'a.assets.json').read_text())
+    assert any(name.endswith('.js.gz') for name in a_assets)
+
+    data = load()
+    data['ingredients'][0]['name'] += ' (renamed)'
+    build(tmp_path, 'b.html', data, split_assets=True)
+    build(tmp_path, 'b.html', split_assets=True, modals='lazy')
+    assert set(a_assets) <= set(assets(tmp_path))
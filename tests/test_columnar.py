@@ -0,0 +1,60 @@
+import json
+import os
+import shutil
+import subprocess
+
+import pytest
+
+import generate_website as site
+
+RESEARCH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'research.json')
+
+# Records decoded in node by the page's own COLUMNAR_RECORDS_SCRIPT from the
+# payload generate_columnar_payload() embeds for them
+def decode(records):
+    if shutil.which('node') is None:
+        pytest.skip('node is not installed')
+    src = (f'const modalPayload = {site.generate_columnar_payload(records)};\n'
+           f'{site.COLUMNAR_RECORDS_SCRIPT}\n'
+           'console.log(JSON.stringify(decodeTable(modalPayload.records, modalPayload.strings)));')
+    proc = subprocess.run(['node', '-e', src], capture_output=True, text=True, check=True)
+    return json.loads(proc.stdout)
+
+def test_round_trip_research_matches_modal_data():
+    data = site.with_stats(site.with_references(site.load_data(RESEARCH)))
+    ingredients = data['ingredients']
+    modal_data = json.loads(''.join(site.generate_json_object((ing['id'], ing) for ing in ingredients)))
+    assert decode(ingredients) == list(modal_data.values())
+
+def test_round_trip_absent_keys():
+    records = [
+        {'id': '1', 'name': 'A', 'slug': 'a'},
+        {'id': '2', 'name': 'B'},
+        {'id': '3', 'slug': 'c', 'extra': None},
+        {'id': '4'}
+    ]
+    assert decode(records) == records
+
+def test_round_trip_nested_evidence_lists():
+    records = [
+        {'id': '1', 'researchEvidence': [
+            {'benefit': 'Sleep', 'rating': 7, 'pmids': ['1', 'PMC2'], 'citations': [None, 'Doe J, J Test (2019): T.']},
+            {'benefit': 'Mood', 'rating': 5, 'pmids': []}
+        ]},
+        {'id': '2', 'researchEvidence': []},
+        {'id': '3', 'researchEvidence': [{'benefit': 'Sleep', 'rating': 9, 'urls': ['https://example.org/é']}]},
+        {'id': '4', 'researchEvidence': [{'benefit': 'Mood', 'rating': 5.5, 'pmids': ['3']}]}
+    ]
+    assert decode(records) == records
+
+def test_round_trip_mixed_and_nested_values():
+    records = [
+        {'id': '1', 'tags': [['a', 'b'], []], 'value': 1, 'meta': {'x': 'y'}},
+        {'id': '2', 'tags': [['a']], 'value': 'one', 'meta': 'plain'},
+        {'id': '3', 'tags': [], 'value': [1, 2], 'meta': None},
+        {'id': '4', 'tags': [['b', 'a', 'a']], 'value': True, 'meta': {'x': 'y', 'z': [1]}}
+    ]
+    assert decode(records) == records
+
+def test_round_trip_empty():
+    assert decode([]) == []
@@ -0,0 +1,54 @@
+import os
+import sqlite3
+
+import generate_website as site
+
+RESEARCH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'research.json')
+
+def build(tmp_path, data, cache):
+    out_path = tmp_path / 'ingredients.html'
+    site.build_site(data, str(out_path), site.BuildOptions(), cache=cache)
+    return out_path.read_text(encoding='utf-8')
+
+def fragment_count(cache_dir):
+    with sqlite3.connect(os.path.join(cache_dir, 'fragments.sqlite')) as db:
+        return db.execute('SELECT COUNT(*) FROM fragments').fetchone()[0]
+
+def test_warm_build_renders_nothing_and_matches(tmp_path):
+    data = site.load_data(RESEARCH)
+    cold = build(tmp_path, data, None)
+    cache = site.FragmentCache(str(tmp_path / 'cache'))
+    assert build(tmp_path, data, cache) == cold
+    assert cache.rendered == 2 * len(data['ingredients'])
+    cache.rendered = 0
+    assert build(tmp_path, data, cache) == cold
+    assert cache.rendered == 0
+    cache.close()
+
+def test_changed_ingredient_is_rendered_again(tmp_path):
+    data = site.load_data(RESEARCH)
+    cache = site.FragmentCache(str(tmp_path / 'cache'))
+    build(tmp_path, data, cache)
+    data['ingredients'][3]['description'] += ' Updated.'
+    cache.rendered = 0
+    assert build(tmp_path, data, cache) == build(tmp_path, data, None)
+    assert cache.rendered == 2
+    cache.close()
+
+def test_save_drops_fragments_of_removed_ingredients(tmp_path):
+    data = site.load_data(RESEARCH)
+    cache_dir = str(tmp_path / 'cache')
+    site.build_site(data, str(tmp_path / 'a.html'), site.BuildOptions(cache_dir=cache_dir))
+    assert fragment_count(cache_dir) == 2 * len(data['ingredients'])
+    data['ingredients'] = data['ingredients'][:5]
+    data['totalIngredients'] = 5
+    site.build_site(data, str(tmp_path / 'a.html'), site.BuildOptions(cache_dir=cache_dir))
+    assert fragment_count(cache_dir) == 10
+
+def test_streamed_input_uses_the_cache(tmp_path):
+    cache = site.FragmentCache(str(tmp_path / 'cache'))
+    loaded = build(tmp_path, site.load_data(RESEARCH), cache)
+    cache.rendered = 0
+    assert build(tmp_path, site.load_data(RESEARCH, stream=True), cache) == loaded
+    assert cache.rendered == 0
+    cache.close()
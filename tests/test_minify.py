@@ -0,0 +1,116 @@
+import json
+import shutil
+import subprocess
+
+import pytest
+
+import generate_website as site
+from generate_website import minify_css, minify_html, minify_js
+
+def html(*chunks):
+    return ''.join(minify_html(chunks))
+
+# Result of evaluating a script under node, so minified code can be checked
+# for behaving the same rather than for matching an exact string
+def run_js(src):
+    if shutil.which('node') is None:
+        pytest.skip('node is not installed')
+    proc = subprocess.run(['node', '-e', src], capture_output=True, text=True, check=True)
+    return proc.stdout
+
+# ASI: a newline that ends a statement must survive where the next line
+# would otherwise continue it
+
+def test_js_keeps_newline_ending_statement_before_paren():
+    assert minify_js('let a = b\n(c || d).run()') == 'let a=b\n(c||d).run()'
+
+def test_js_keeps_newline_after_return():
+    assert minify_js('function f() {\n    return\n    value;\n}') == 'function f(){return\nvalue;}'
+
+def test_js_keeps_newline_between_increment_and_identifier():
+    assert minify_js('a\n++b') == 'a\n++b'
+
+def test_js_drops_newline_between_punctuation():
+    assert minify_js('f(a,\n  b);\n\ng();\n') == 'f(a,b);g();'
+
+def test_js_keeps_space_between_words_and_repeated_operators():
+    assert minify_js('const x = typeof y;') == 'const x=typeof y;'
+    assert minify_js('a + +b - -c') == 'a+ +b- -c'
+
+def test_js_drops_comments():
+    assert minify_js('a = 1; // one\n/* two\n*/ b = 2; /* three */ c = 3;') == 'a=1;b=2;c=3;'
+
+def test_js_comment_with_newline_still_ends_statement():
+    assert minify_js('a = b /* x\n */ (c)') == 'a=b\n(c)'
+
+# Regular expressions versus division
+
+def test_js_division_after_identifier_and_paren():
+    assert minify_js('x = a / b / c; y = (a) / 2;') == 'x=a/b/c;y=(a)/2;'
+
+def test_js_regex_after_operator_and_keyword():
+    assert minify_js('s.replace(/[&<>"\']/g, f); return /a b/.test(s);') == \
+        's.replace(/[&<>"\']/g,f);return/a b/.test(s);'
+
+def test_js_regex_with_slash_in_class_and_comment_lookalike():
+    assert minify_js('const r = /[/]\\/ x/g; // c') == 'const r=/[/]\\/ x/g;'
+
+def test_js_regex_and_division_evaluate_the_same():
+    src = 'const a = 10, b = 2, g = 5;\nconsole.log(a / b / g, "x/y".split(/\\//).length, /a b/g.source)'
+    assert run_js(minify_js(src)) == run_js(src)
+
+# String and template literals are copied as written
+
+def test_js_strings_keep_spaces_and_comment_markers():
+    assert minify_js('s = "a  // b" + \'/* c */\';') == 's="a  // b"+\'/* c */\';'
+
+def test_js_template_literal_keeps_whitespace():
+    src = 'el.innerHTML = `\n    <div class="x">  ${ a +  b }  </div>\n`;'
+    assert minify_js(src) == src.replace('el.innerHTML = ', 'el.innerHTML=')
+
+def test_js_nested_template_literal_with_braces():
+    src = 'const t = `a ${ xs.map(x => `<b>${ {k: x}.k }</b>`).join("}") } c`;\nconsole.log(t)'
+    assert run_js('const xs = [1, 2];\n' + minify_js(src)) == run_js('const xs = [1, 2];\n' + src)
+
+def test_js_page_script_still_parses():
+    for options in (site.BuildOptions(), site.BuildOptions(modals='lazy', grid='virtual', search='worker')):
+        src = minify_js(''.join(site.generate_page_script(options)))
+        run_js(f'new Function({json.dumps(src)})')
+
+# CSS
+
+def test_css_drops_comments_and_whitespace():
+    css = '/* note */\n.a  >  .b ,\n.c {\n    color: red ;\n    margin: 0 auto;\n}\n'
+    assert minify_css(css) == '.a>.b,.c{color:red;margin:0 auto}'
+
+def test_css_keeps_strings():
+    assert minify_css('.q::before { content: "  /* not a comment */ ; " ; }') == \
+        '.q::before{content:"  /* not a comment */ ; "}'
+
+def test_css_keeps_space_in_selectors_and_values():
+    assert minify_css('.a .b:hover { font: 12px  "IBM Plex Sans", sans-serif; }') == \
+        '.a .b:hover{font:12px "IBM Plex Sans",sans-serif}'
+
+# HTML
+
+def test_html_drops_whitespace_between_block_tags_and_comments():
+    assert html('<div>\n    <!-- note -->\n    <p>  Hello\n   world  </p>\n</div>\n') == \
+        '<div><p>Hello world</p></div>'
+
+def test_html_keeps_one_space_around_inline_tags():
+    assert html('<p>a <strong> b </strong>  c</p>') == '<p>a <strong> b </strong> c</p>'
+
+def test_html_keeps_pre_and_textarea_content():
+    src = '<div>\n  <pre>  line 1\n\n    line 2  </pre>\n  <textarea>\n  x  </textarea>\n</div>'
+    assert html(src) == '<div><pre>  line 1\n\n    line 2  </pre> <textarea>\n  x  </textarea></div>'
+
+def test_html_keeps_script_and_style_content():
+    src = '<head>\n  <style>\n  a  >  b { }\n  </style>\n</head>\n<script>\n  if (a <b && c> d) {}\n</script>'
+    assert html(src) == '<head><style>\n  a  >  b { }\n  </style></head><script>\n  if (a <b && c> d) {}\n</script>'
+
+def test_html_raw_content_across_chunks():
+    chunks = ['<div>\n  <script>', '\n  const s = "<p>  x  </p>";\n', '  </script>\n</div>']
+    assert html(*chunks) == '<div><script>\n  const s = "<p>  x  </p>";\n  </script></div>'
+
+def test_html_collapses_whitespace_split_across_chunks():
+    assert html('<p>a  ', '   b</p>', '\n\n', '<div>c</div>') == '<p>a b</p><div>c</div>'
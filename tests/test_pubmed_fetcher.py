@@ -0,0 +1,84 @@
+import asyncio
+import json
+
+import pytest
+
+import pubmed_fetcher
+from eutils_stub import EUtilsStub, abstract, summary
+
+PMIDS = [str(10000000 + i) for i in range(450)]
+
+# Fetch pmids from a stub, fast enough for tests: no rate limit pauses or backoff
+def fetch(stub, pmids, connections=3, retries=5):
+    async def run():
+        async with pubmed_fetcher.PubMedFetcher(stub.base_url, rate=1000, connections=connections,
+                                                retries=retries, backoff=0) as fetcher:
+            return await fetcher.fetch(pmids)
+    return asyncio.run(run())
+
+def expected_record(pmid):
+    item = summary(pmid)
+    return {
+        'pmid': pmid,
+        'title': item['title'],
+        'authors': [author['name'] for author in item['authors']],
+        'journal': item['fulljournalname'],
+        'year': 2019,
+        'abstract': f'BACKGROUND: {abstract(pmid)}'
+    }
+
+def test_fetch_batches_ids():
+    with EUtilsStub() as stub:
+        records = fetch(stub, PMIDS + PMIDS[:10])
+    assert records == {pmid: expected_record(pmid) for pmid in PMIDS}
+    for endpoint in ('esummary.fcgi', 'efetch.fcgi'):
+        batches = [pmids for name, pmids in stub.requests if name == endpoint]
+        assert sorted(len(batch) for batch in batches) == [50, 200, 200]
+        assert sorted(pmid for batch in batches for pmid in batch) == PMIDS
+
+def test_fetch_skips_unknown_pmids():
+    with EUtilsStub() as stub:
+        records = fetch(stub, ['123', '999'])
+    assert list(records) == ['123']
+
+def test_fetch_retries_rate_limited_requests():
+    with EUtilsStub(rate_limit=3) as stub:
+        records = fetch(stub, PMIDS[:5])
+    assert records == {pmid: expected_record(pmid) for pmid in PMIDS[:5]}
+    assert len(stub.requests) == 5
+
+def test_fetch_gives_up_after_retries():
+    with EUtilsStub(rate_limit=100) as stub:
+        with pytest.raises(pubmed_fetcher.EUtilsError, match='after 3 attempts: HTTP 429'):
+            fetch(stub, PMIDS[:5], connections=1, retries=2)
+
+def test_fetch_reads_chunked_responses():
+    with EUtilsStub(chunked=True) as stub:
+        records = fetch(stub, PMIDS)
+    assert records == {pmid: expected_record(pmid) for pmid in PMIDS}
+
+def test_fetch_reuses_connections():
+    with EUtilsStub() as stub:
+        fetch(stub, PMIDS, connections=1)
+    assert len(stub.requests) == 6
+    assert stub.connections == 1
+
+def test_fetch_reconnects_when_idle_connection_dropped():
+    with EUtilsStub(drop_connections=True) as stub:
+        records = fetch(stub, PMIDS, connections=1)
+    assert records == {pmid: expected_record(pmid) for pmid in PMIDS}
+    assert len(stub.requests) == 6
+    assert stub.connections == 6
+
+def test_connection_pool_returns_status_and_body():
+    async def run(stub):
+        pool = pubmed_fetcher.ConnectionPool(stub.base_url, size=1)
+        try:
+            return await pool.get('esummary.fcgi', {'id': '42'})
+        finally:
+            await pool.close()
+    with EUtilsStub(chunked=True) as stub:
+        status, headers, body = asyncio.run(run(stub))
+    assert status == 200
+    assert headers['transfer-encoding'] == 'chunked'
+    assert json.loads(body)['result']['42']['title'] == 'Article 42'
@@ -0,0 +1,32 @@
+import os
+
+import pytest
+
+import generate_website as site
+
+RESEARCH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'research.json')
+
+@pytest.mark.parametrize('shard', ['category', 'pages'])
+def test_loaded_shards_hold_their_own_ingredients(shard):
+    data = site.with_stats(site.with_references(site.load_data(RESEARCH)))
+    options = site.BuildOptions(shard=shard, page_size=7)
+    shards = site.plan_shards(data, options, 'out/ingredients.html')
+    for shard_info in shards:
+        assert isinstance(shard_info['data']['ingredients'], list)
+        assert len(shard_info['data']['ingredients']) == shard_info['count']
+    ids = [ing['id'] for shard_info in shards for ing in shard_info['data']['ingredients']]
+    expected = [ing['id'] for ing in data['ingredients']]
+    assert (ids if shard == 'pages' else sorted(ids)) == (expected if shard == 'pages' else sorted(expected))
+
+@pytest.mark.parametrize('shard', ['category', 'pages'])
+def test_streamed_shards_match_loaded_ones(tmp_path, shard):
+    options = site.BuildOptions(shard=shard, page_size=7)
+    (tmp_path / 'loaded').mkdir()
+    (tmp_path / 'streamed').mkdir()
+    loaded = site.build_site(site.load_data(RESEARCH), str(tmp_path / 'loaded' / 'a.html'), options)
+    streamed = site.build_site(site.load_data(RESEARCH, stream=True), str(tmp_path / 'streamed' / 'a.html'), options)
+    assert [os.path.basename(path) for path in loaded] == [os.path.basename(path) for path in streamed]
+    assert len(loaded) > 2
+    for a, b in zip(loaded, streamed):
+        with open(a, encoding='utf-8') as fa, open(b, encoding='utf-8') as fb:
+            assert fa.read() == fb.read()
@@ -0,0 +1,186 @@
+import os
+
+import pytest
+
+import generate_website as site
+from generate_website import DatasetError, validate_data
+
+RESEARCH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'research.json')
+
+def evidence(**fields):
+    ev = {
+        'benefit': 'Sleep',
+        'description': 'Improves sleep quality.',
+        'clinicalDosage': '300mg daily',
+        'rating': 7,
+        'impact': 'High',
+        'confidence': 'Medium',
+        'refs': [0]
+    }
+    ev.update(fields)
+    return {key: value for key, value in ev.items() if value is not None}
+
+def ingredient(ing_id='1', **fields):
+    ing = {
+        'id': ing_id,
+        'name': 'Magnesium',
+        'category': 'Minerals',
+        'products': ['Essentials'],
+        'blueprintDosage': '400mg',
+        'molecularFormula': 'Mg',
+        'description': 'An essential mineral.',
+        'mechanism': 'Cofactor for hundreds of enzymes.',
+        'keyBenefits': ['Sleep'],
+        'safety': {'maxSafeDosage': '350mg', 'sideEffects': [], 'contraindications': ['Kidney disease']},
+        'researchEvidence': [evidence()]
+    }
+    ing.update(fields)
+    return {key: value for key, value in ing.items() if value is not None}
+
+def dataset(*ingredients, **fields):
+    ingredients = list(ingredients) or [ingredient()]
+    data = {
+        'version': '1.0.0',
+        'lastUpdated': '2025-01-01',
+        'description': 'Test data',
+        'disclaimer': 'Not medical advice',
+        'totalIngredients': len(ingredients),
+        'categories': ['Minerals', 'Vitamins'],
+        'products': ['Essentials', 'Longevity Mix'],
+        'references': [{'pmid': '12345'}, {'pmcid': 'PMC67890'}],
+        'ingredients': ingredients
+    }
+    data.update(fields)
+    return {key: value for key, value in data.items() if value is not None}
+
+def errors(data):
+    with pytest.raises(DatasetError) as info:
+        validate_data(data)
+    return info.value.errors
+
+def test_valid_datasets_pass():
+    validate_data(site.load_data(RESEARCH))
+    validate_data(site.load_data(RESEARCH, stream=True))
+    validate_data(dataset())
+
+def test_legacy_pmids_and_urls_pass():
+    legacy = dataset(ingredient(researchEvidence=[
+        evidence(refs=None, pmids=['12345', 'PMC67890'],
+                 urls=['https://pubmed.ncbi.nlm.nih.gov/12345/', 'https://pmc.ncbi.nlm.nih.gov/articles/PMC67890/']),
+        evidence(refs=None, pmids=['67890'], urls=['https://www.ncbi.nlm.nih.gov/pmc/articles/PMC67890']),
+        evidence(refs=None, pmids=['12345'])
+    ]), references=None)
+    validate_data(legacy)
+
+def test_error_message_names_every_problem():
+    error = DatasetError(['a: one', 'b: two'])
+    assert str(error) == '2 schema errors:\n  a: one\n  b: two'
+
+@pytest.mark.parametrize('fields, expected', [
+    ({'version': 1}, 'version: expected a string, found an integer'),
+    ({'disclaimer': None}, 'disclaimer: expected a string, found missing'),
+    ({'totalIngredients': '1'}, 'totalIngredients: expected an integer, found a string'),
+    ({'totalIngredients': 3}, 'totalIngredients: 3, but the dataset has 1 ingredients'),
+    ({'categories': ['Minerals', 2]}, 'categories: expected an array of strings, found an array'),
+    ({'products': 'Essentials'}, 'products: expected an array of strings, found a string'),
+    ({'ingredients': {'1': {}}, 'totalIngredients': 0}, 'ingredients: expected an array, found an object'),
+    ({'references': {'pmid': '1'}, 'ingredients': [ingredient(researchEvidence=[])]},
+     'references: expected an array, found an object'),
+    ({'references': [{'pmid': '12345'}, 'PMC1']}, 'references[1]: expected an object with either a pmid or a pmcid'),
+    ({'references': [{'pmid': '12345', 'pmcid': 'PMC1'}]},
+     'references[0]: expected an object with either a pmid or a pmcid'),
+    ({'references': [{'pmid': '12a45'}]}, "references[0].pmid: expected a PMID string, found '12a45'"),
+    ({'references': [{'pmid': 12345}]}, 'references[0].pmid: expected a PMID string, found 12345'),
+    ({'references': [{'pmcid': '67890'}]}, "references[0].pmcid: expected a PMCID string, found '67890'"),
+    ({'references': [{'pmid': '12345'}, {'pmid': '12345'}]}, 'references[1].pmid: 12345 is already references[0]'),
+    ({'references': [{'pmcid': 'PMC1'}, {'pmcid': 'PMC1'}]}, 'references[1].pmcid: PMC1 is already references[0]'),
+])
+def test_dataset_errors(fields, expected):
+    assert errors(dataset(**fields)) == [expected]
+
+def test_non_ascii_digits_are_not_ids():
+    assert errors(dataset(references=[{'pmid': '12²'}])) == ["references[0].pmid: expected a PMID string, found '12²'"]
+
+@pytest.mark.parametrize('fields, expected', [
+    ({'name': None}, 'ingredients[0].name: expected a string, found missing'),
+    ({'mechanism': ['x']}, 'ingredients[0].mechanism: expected a string, found an array'),
+    ({'keyBenefits': 'Sleep'}, 'ingredients[0].keyBenefits: expected an array of strings, found a string'),
+    ({'products': [['Essentials']]}, 'ingredients[0].products: expected an array of strings, found an array'),
+    ({'id': '1a'}, "ingredients[0].id: expected a string of digits, found '1a'"),
+    ({'id': 1}, 'ingredients[0].id: expected a string, found an integer'),
+    ({'category': 'Herbs'}, "ingredients[0].category: 'Herbs' is not listed in categories"),
+    ({'products': ['Essentials', 'Other']}, "ingredients[0].products: 'Other' is not listed in products"),
+    ({'safety': []}, 'ingredients[0].safety: expected an object, found an array'),
+    ({'safety': {'sideEffects': [], 'contraindications': []}},
+     'ingredients[0].safety.maxSafeDosage: expected a string, found missing'),
+    ({'safety': {'maxSafeDosage': '1g', 'sideEffects': [1], 'contraindications': []}},
+     'ingredients[0].safety.sideEffects: expected an array of strings, found an array'),
+    ({'researchEvidence': None}, 'ingredients[0].researchEvidence: expected an array, found missing'),
+])
+def test_ingredient_errors(fields, expected):
+    assert errors(dataset(ingredient(**fields))) == [expected]
+
+def test_ingredient_not_an_object():
+    assert errors(dataset(ingredient(), 'Magnesium')) == ['ingredients[1]: expected an object, found a string']
+
+def test_duplicate_ingredient_id():
+    assert errors(dataset(ingredient('4'), ingredient('4'))) == \
+        ['ingredients[1].id: 4 is already the id of ingredients[0]']
+
+EV = 'ingredients[0].researchEvidence[0]'
+LEVELS = 'High, Medium, Low'
+
+@pytest.mark.parametrize('fields, expected', [
+    ({'benefit': None}, f'{EV}.benefit: expected a string, found missing'),
+    ({'clinicalDosage': 300}, f'{EV}.clinicalDosage: expected a string, found an integer'),
+    ({'rating': 11}, f'{EV}.rating: expected an integer from 0 to 10, found 11'),
+    ({'rating': 7.5}, f'{EV}.rating: expected an integer from 0 to 10, found 7.5'),
+    ({'rating': None}, f'{EV}.rating: expected an integer from 0 to 10, found missing'),
+    ({'impact': 'Huge'}, f"{EV}.impact: expected one of {LEVELS}, found 'Huge'"),
+    ({'impact': ['High']}, f"{EV}.impact: expected one of {LEVELS}, found ['High']"),
+    ({'confidence': None}, f'{EV}.confidence: expected one of {LEVELS}, found missing'),
+    ({'pmids': ['12345']}, f'{EV}: refs cannot be combined with pmids or urls'),
+    ({'refs': [0, 2]}, f'{EV}.refs: expected an array of indices into references (0 to 1), found [0, 2]'),
+    ({'refs': [-1]}, f'{EV}.refs: expected an array of indices into references (0 to 1), found [-1]'),
+    ({'refs': ['0']}, f"{EV}.refs: expected an array of indices into references (0 to 1), found ['0']"),
+    ({'refs': None, 'pmids': ['12345', 'PMC1x']},
+     f"{EV}.pmids: expected an array of PMID or PMCID strings, found ['12345', 'PMC1x']"),
+    ({'refs': None, 'pmids': '12345'}, f"{EV}.pmids: expected an array of PMID or PMCID strings, found '12345'"),
+    ({'refs': None, 'pmids': [12345]}, f'{EV}.pmids: expected an array of PMID or PMCID strings, found [12345]'),
+    ({'refs': None, 'pmids': ['12345'], 'urls': 'https://pubmed.ncbi.nlm.nih.gov/12345/'},
+     f"{EV}.urls: expected an array of one url per pmid, found 'https://pubmed.ncbi.nlm.nih.gov/12345/'"),
+    ({'refs': None, 'pmids': ['12345'], 'urls': []}, f'{EV}.urls: expected an array of one url per pmid, found []'),
+    ({'refs': None, 'pmids': ['12345', '678'],
+      'urls': ['https://pubmed.ncbi.nlm.nih.gov/12345/', 'https://pubmed.ncbi.nlm.nih.gov/679/']},
+     f"{EV}.urls[1]: 'https://pubmed.ncbi.nlm.nih.gov/679/' does not link to 678"),
+    ({'refs': None, 'pmids': ['12345'], 'urls': [None]}, f'{EV}.urls[0]: None does not link to 12345'),
+    ({'refs': None, 'urls': ['https://pubmed.ncbi.nlm.nih.gov/12345/']},
+     f'{EV}.urls: urls need the pmids they link to'),
+])
+def test_evidence_errors(fields, expected):
+    assert errors(dataset(ingredient(researchEvidence=[evidence(**fields)]))) == [expected]
+
+def test_refs_without_references_table():
+    assert errors(dataset(references=None)) == [f'{EV}.refs: the dataset has no references table']
+
+def test_evidence_not_an_object():
+    assert errors(dataset(ingredient(researchEvidence=[evidence(), 3]))) == \
+        ['ingredients[0].researchEvidence[1]: expected an object, found an integer']
+
+def test_urls_split_across_entries_do_not_match():
+    pmids = ['12345', '678']
+    urls = ['https://pubmed.ncbi.nlm.nih.gov/12345/\nhttps://pubmed.ncbi.nlm.nih.gov/678/', '']
+    assert errors(dataset(ingredient(researchEvidence=[evidence(refs=None, pmids=pmids, urls=urls)]))) == [
+        f"{EV}.urls[0]: {urls[0]!r} does not link to 12345",
+        f"{EV}.urls[1]: '' does not link to 678"
+    ]
+
+def test_every_problem_is_reported():
+    data = dataset(ingredient('1', category='Herbs'), ingredient('1'), version=None)
+    data['ingredients'][1]['researchEvidence'][0]['rating'] = 'high'
+    assert errors(data) == [
+        'version: expected a string, found missing',
+        "ingredients[0].category: 'Herbs' is not listed in categories",
+        'ingredients[1].id: 1 is already the id of ingredients[0]',
+        "ingredients[1].researchEvidence[0].rating: expected an integer from 0 to 10, found 'high'"
+    ]